@@ -0,0 +1,189 @@
+import argparse
+import multiprocessing
+import time
+
+from SudokuSolver.budget import BudgetExceeded
+from SudokuSolver.cache import SolutionCache
+from SudokuSolver.puzzle_io import PuzzleWriter, format_grid, parse_puzzle, read_puzzles
+from SudokuSolver.solver import BACKENDS, Solver
+
+_worker_options = dict()
+
+
+def solve_puzzle(line, **options):
+    """ solves one puzzle line and returns its result record """
+    start = time.perf_counter()
+
+    try:
+        matrix = parse_puzzle(line)
+    except ValueError as error:
+        return _invalid(line, str(error), start)
+
+    return _solve_matrix(line, matrix, start, options)
+
+
+def _invalid(line, error, start):
+    return {'puzzle': line.strip(), 'solution': None, 'status': 'invalid', 'error': error, 'nodes': 0,
+            'time': time.perf_counter() - start}
+
+
+def _solve_matrix(line, matrix, start, options):
+    solver = Solver(matrix=matrix, size=len(matrix), **options)
+    validation_status, solver_status = solver.solve()
+
+    if not validation_status:
+        status = 'invalid'
+    elif solver_status:
+        # every solution is checked against its rows, columns, boxes and givens before it goes out
+        status = 'solved' if solver.verify() else 'unverified'
+    elif isinstance(solver_status, BudgetExceeded):
+        status = 'budget_exceeded'
+    else:
+        status = 'unsolvable'
+
+    solution = format_grid([[cell.val for cell in row] for row in solver.matrix]) if status == 'solved' else None
+
+    result = {'puzzle': line.strip(), 'solution': solution, 'status': status, 'nodes': solver.total_moves,
+              'time': time.perf_counter() - start}
+    if status == 'budget_exceeded':
+        # 'nodes', 'time' or 'cancelled'
+        result['reason'] = solver_status.reason
+    return result
+
+
+def _init_worker(options):
+    _worker_options.clear()
+    _worker_options.update(options)
+
+    # every worker keeps its own cache; a cache_path file is shared between them
+    cache_size = _worker_options.pop('cache_size', None)
+    cache_path = _worker_options.pop('cache_path', None)
+    if cache_size or cache_path:
+        _worker_options['cache'] = SolutionCache(cache_size or 4096, cache_path)
+
+
+def _solve_indexed(indexed_line):
+    index, line = indexed_line
+    result = solve_puzzle(line, **_worker_options)
+    result['index'] = index
+    return result
+
+
+def _solve_block(block):
+    """ parses a block of (index, line) pairs, validates each size group in one vectorized pass and
+        solves the valid puzzles without validating them again """
+    from SudokuSolver import vectorized
+
+    start = time.perf_counter()
+    results = dict()
+    by_size = dict()
+
+    for index, line in block:
+        try:
+            matrix = parse_puzzle(line)
+        except ValueError as error:
+            results[index] = _invalid(line, str(error), start)
+            continue
+        by_size.setdefault(len(matrix), []).append((index, line, matrix))
+
+    for group in by_size.values():
+        puzzles = vectorized.to_array([matrix for _, _, matrix in group])
+        valid = vectorized.validate_batch(puzzles)
+        rows, columns, boxes = vectorized.unit_masks(puzzles)
+
+        for position, (index, line, matrix) in enumerate(group):
+            if not valid[position]:
+                results[index] = _invalid(line, "Repeated value in a row, column or box", start)
+                continue
+            options = dict(_worker_options, validated=True,
+                           unit_masks=(rows[position], columns[position], boxes[position]))
+            results[index] = _solve_matrix(line, matrix, time.perf_counter(), options)
+
+    for index, result in results.items():
+        result['index'] = index
+
+    return [results[index] for index, _ in block]
+
+
+def _blocks(indexed, size):
+    block = []
+    for indexed_line in indexed:
+        block.append(indexed_line)
+        if len(block) == size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def solve_batch(puzzles, workers=None, chunksize=64, ordered=True, vectorized=False, **options):
+    """ solves an iterable of puzzle lines on a pool of worker processes
+
+        results are yielded as they come back, in input order when ordered is set and in completion
+        order otherwise; every record carries the puzzle's 'index' in the input.
+        workers=1 solves in this process, None uses one worker per core.
+        vectorized hands each worker whole chunks that it validates with NumPy in one pass.
+        cache_size and cache_path give each worker a SolutionCache of that size, backed by that file.
+        other options are passed on to Solver (backend, heuristic, candidates, propagation,
+        max_nodes, timeout, deadline) """
+    indexed = enumerate(puzzles)
+
+    if vectorized:
+        tasks, solve_task, task_chunksize = _blocks(indexed, chunksize), _solve_block, 1
+    else:
+        tasks, solve_task, task_chunksize = indexed, _solve_indexed, chunksize
+
+    if workers == 1:
+        _init_worker(options)
+        results = map(solve_task, tasks)
+    else:
+        pool = multiprocessing.Pool(processes=workers, initializer=_init_worker, initargs=(options,))
+        mapper = pool.imap if ordered else pool.imap_unordered
+        results = mapper(solve_task, tasks, task_chunksize)
+
+    try:
+        for result in results:
+            if vectorized:
+                for record in result:
+                    yield record
+            else:
+                yield result
+    finally:
+        if workers != 1:
+            pool.terminate()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a file of puzzles, one per line")
+    parser.add_argument('puzzles', help="puzzle file, plain or .gz/.bz2, '-' for stdin")
+    parser.add_argument('-o', '--output', default='-', help="JSON lines output file, .gz/.bz2 to compress it")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes, one per core by default")
+    parser.add_argument('-c', '--chunksize', type=int, default=64, help="puzzles handed to a worker at a time")
+    parser.add_argument('--unordered', action='store_true', help="write results in completion order")
+    parser.add_argument('--mmap', action='store_true', help="read a plain puzzle file through a memory map")
+    parser.add_argument('--buffer', type=int, default=1024, help="results held before they are written out")
+    parser.add_argument('--backend', default='backtracking', choices=BACKENDS)
+    parser.add_argument('--heuristic', default='mrv', choices=('mrv', 'weight'))
+    parser.add_argument('--propagation', action='store_true', help="enable the propagation rules, all but x_wing")
+    parser.add_argument('--vectorized', action='store_true', help="validate each chunk in one NumPy pass")
+    parser.add_argument('--cache', type=int, help="solutions each worker keeps for repeated or equivalent puzzles")
+    parser.add_argument('--cache-file', help="SQLite file the solution cache is kept in across runs")
+    parser.add_argument('--max-nodes', type=int, help="search nodes a puzzle may take before it is given up")
+    parser.add_argument('--timeout', type=float, help="seconds a puzzle may take before it is given up")
+    args = parser.parse_args(argv)
+
+    options = {'backend': args.backend, 'heuristic': args.heuristic, 'propagation': args.propagation,
+               'cache_size': args.cache, 'cache_path': args.cache_file, 'max_nodes': args.max_nodes,
+               'timeout': args.timeout}
+
+    results = solve_batch(read_puzzles(args.puzzles, use_mmap=args.mmap), workers=args.workers,
+                          chunksize=args.chunksize, ordered=not args.unordered, vectorized=args.vectorized,
+                          **options)
+
+    with PuzzleWriter(args.output, buffer_size=args.buffer) as writer:
+        for result in results:
+            writer.write_record(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from SudokuSolver.puzzle_io import read_matrices
+from SudokuSolver.solver import Solver
+
+CORPORA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpora')
+
+CORPORA = ('easy', '17clue', 'hardest', '16x16', '25x25')
+
+# solver engine and heuristic combinations, passed to Solver as keyword arguments
+CONFIGURATIONS = {
+    'mrv': {},
+    'weight': {'heuristic': 'weight'},
+    'set-candidates': {'candidates': 'set'},
+    'propagation': {'propagation': True},
+    'dlx': {'backend': 'dlx'},
+    'compact': {'backend': 'compact'},
+}
+
+# combinations left out of default runs because a single puzzle can take minutes: on 16x16 and 25x25
+# puzzles at generator clue counts only propagation and exact cover avoid the long tail of plain search
+SLOW = set((name, corpus) for name in ('mrv', 'weight', 'set-candidates', 'compact') for corpus in ('16x16', '25x25'))
+
+# metrics where a higher value is the better one; every other compared metric should go down
+HIGHER_IS_BETTER = ('puzzles_per_sec',)
+COMPARED = ('puzzles_per_sec', 'p50_ms', 'p99_ms', 'nodes', 'peak_memory_kb')
+
+
+def load_corpus(name):
+    return list(read_matrices(os.path.join(CORPORA_DIR, name + '.txt')))
+
+
+def percentile(sorted_values, fraction):
+    """ nearest-rank percentile of an ascending list """
+    if not sorted_values:
+        return 0.0
+    rank = max(int(math.ceil(fraction * len(sorted_values))) - 1, 0)
+    return sorted_values[rank]
+
+
+def solve_once(matrix, options):
+    solver = Solver(matrix=[row[:] for row in matrix], size=len(matrix), **options)
+    start = time.perf_counter()
+    validation_status, solver_status = solver.solve()
+    return time.perf_counter() - start, solver.total_moves, bool(validation_status and solver_status)
+
+
+def run(puzzles, options, repeat=1):
+    """ solves every puzzle repeat times and returns throughput, latency, node and memory figures
+
+        peak memory comes from a separate tracemalloc pass so tracing does not skew the timings """
+    latencies = []
+    nodes = 0
+    solved = 0
+
+    for _ in range(repeat):
+        for matrix in puzzles:
+            elapsed, moves, status = solve_once(matrix, options)
+            latencies.append(elapsed)
+            nodes += moves
+            solved += status
+
+    tracemalloc.start()
+    try:
+        peak = 0
+        for matrix in puzzles:
+            gc.collect()
+            tracemalloc.reset_peak()
+            solve_once(matrix, options)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+
+    total = sum(latencies)
+    latencies.sort()
+
+    return {
+        'puzzles': len(latencies),
+        'solved': solved,
+        'puzzles_per_sec': len(latencies) / total if total else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'nodes': nodes / len(latencies) if latencies else 0,
+        'peak_memory_kb': peak / 1024,
+    }
+
+
+def run_suite(configurations=None, corpora=None, repeat=1, include_slow=False, report=None):
+    configurations = configurations or sorted(CONFIGURATIONS)
+    corpora = corpora or CORPORA
+    results = dict()
+
+    for corpus in corpora:
+        puzzles = load_corpus(corpus)
+        for name in configurations:
+            if (name, corpus) in SLOW and not include_slow:
+                continue
+            metrics = run(puzzles, CONFIGURATIONS[name], repeat)
+            results.setdefault(name, dict())[corpus] = metrics
+            if report:
+                report(name, corpus, metrics)
+
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'timestamp': time.time(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.10):
+    """ (configuration, corpus, metric, baseline value, current value) for every metric that got
+        worse by more than threshold, as a fraction of the baseline value """
+    regressions = []
+
+    for name, corpora in sorted(current['results'].items()):
+        for corpus, metrics in sorted(corpora.items()):
+            before = baseline['results'].get(name, dict()).get(corpus)
+            if not before:
+                continue
+            for metric in COMPARED:
+                old, new = before[metric], metrics[metric]
+                if not old:
+                    continue
+                change = (old - new) / old if metric in HIGHER_IS_BETTER else (new - old) / old
+                if change > threshold:
+                    regressions.append((name, corpus, metric, old, new))
+
+    return regressions
+
+
+def print_metrics(name, corpus, metrics):
+    print("{:<15} {:<8} {:>5}/{:<5} {:>10.1f}/s  p50 {:>9.3f}ms  p99 {:>9.3f}ms  {:>10.0f} nodes  {:>9.0f} KiB".format(
+        name, corpus, metrics['solved'], metrics['puzzles'], metrics['puzzles_per_sec'], metrics['p50_ms'],
+        metrics['p99_ms'], metrics['nodes'], metrics['peak_memory_kb']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the solver engines on the bundled corpora")
+    parser.add_argument('--configs', help="comma separated subset of: " + ', '.join(sorted(CONFIGURATIONS)))
+    parser.add_argument('--corpora', help="comma separated subset of: " + ', '.join(CORPORA))
+    parser.add_argument('--repeat', type=int, default=3, help="timed passes over each corpus")
+    parser.add_argument('--include-slow', action='store_true', help="also run " + ', '.join(
+        '{}/{}'.format(*pair) for pair in sorted(SLOW)))
+    parser.add_argument('-o', '--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="JSON results of an earlier run to check for regressions")
+    parser.add_argument('--threshold', type=float, default=0.10, help="allowed slowdown as a fraction")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.configs.split(',') if args.configs else None,
+                        args.corpora.split(',') if args.corpora else None,
+                        args.repeat, args.include_slow, report=print_metrics)
+
+    if args.output:
+        with open(args.output, 'w') as stream:
+            json.dump(results, stream, indent=2)
+
+    if args.compare:
+        with open(args.compare) as stream:
+            baseline = json.load(stream)
+        regressions = compare(baseline, results, args.threshold)
+        for name, corpus, metric, old, new in regressions:
+            print("REGRESSION {} {} {}: {:.3f} -> {:.3f}".format(name, corpus, metric, old, new))
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,199 @@
+import tkinter as tk
+
+from SudokuSolver.grid import Grid
+from SudokuSolver.puzzle_io import SYMBOLS, symbol
+
+EMPTY_CELL_VALUE = Grid.EMPTY_CELL_VALUE
+
+# (background, text colour) per cell style, the colours the widget per cell layout used
+STYLES = {
+    'empty': ('rosybrown1', 'black'),
+    'given': ('rosybrown3', 'white'),
+    'entered': ('rosybrown3', 'white'),
+    'solved': ('rosybrown2', 'black'),
+    'conflict': ('indianred2', 'white'),
+}
+
+# keys that clear the selected cell
+CLEAR_KEYS = ('BackSpace', 'Delete', 'space', 'period', '0')
+MOVES = {'Up': (-1, 0), 'Down': (1, 0), 'Left': (0, -1), 'Right': (0, 1)}
+
+
+def cell_size_for(size, board_pixels=600):
+    return max(18, min(64, board_pixels // size))
+
+
+class CanvasBoard(tk.Canvas):
+    """ the whole grid drawn on one Canvas
+
+        every cell is a rectangle, a value text and a candidates text item, created once; changes only
+        mark cells dirty and a single idle callback reconfigures the dirty items. Keys typed on the
+        board edit the selected cell through on_edit(cell, value), which may raise ValueError. On grids with
+        more values than SYMBOLS values are typed as numbers, digits typed on one cell making up one value """
+
+    def __init__(self, master, solver, session, on_edit, cell_size=None, **kwargs):
+        self.size = len(solver.matrix)
+        self.box_rows, self.box_columns = solver.topology.box
+        self.cell_size = cell_size or cell_size_for(self.size)
+        self.margin = 4
+        pixels = self.size * self.cell_size + 2 * self.margin
+
+        super().__init__(master, width=pixels, height=pixels, bg='white', highlightthickness=0, **kwargs)
+
+        self.solver = solver
+        self.session = session
+        self.on_edit = on_edit
+        self.editable = True
+        self.show_candidates = False
+        self.selected = None
+        # digits typed on the selected cell so far, for grids whose values run past SYMBOLS
+        self.entry = ''
+
+        # what each cell shows: value, candidates and style, drawn by flush()
+        cells = solver.cells
+        self.givens = set(cell for cell in cells if cell.val != EMPTY_CELL_VALUE)
+        self.values = [cell.val for cell in cells]
+        self.candidates = [list(cell.possible_moves) for cell in cells]
+        self.styles = [self.style_of(cell) for cell in cells]
+        self.dirty = set()
+        self.pending = None
+
+        self.rectangles = []
+        self.texts = []
+        self.candidate_texts = []
+        self.draw()
+
+        self.bind('<Button-1>', self.on_click)
+        self.bind('<Key>', self.on_key)
+
+    def origin(self, index):
+        row, column = divmod(index, self.size)
+        return self.margin + column * self.cell_size, self.margin + row * self.cell_size
+
+    def draw(self):
+        value_font = ('Times', max(8, self.cell_size // 2), 'bold')
+        candidate_font = ('Times', max(6, self.cell_size // 6), 'italic')
+        cell_size = self.cell_size
+
+        for index in range(self.size * self.size):
+            x, y = self.origin(index)
+            self.rectangles.append(self.create_rectangle(x, y, x + cell_size, y + cell_size, outline='white'))
+            self.texts.append(self.create_text(x + cell_size // 2, y + cell_size // 2, font=value_font))
+            self.candidate_texts.append(self.create_text(x + 2, y + 1, anchor=tk.NW, font=candidate_font,
+                                                         width=cell_size - 4, fill='gray25', state=tk.HIDDEN))
+            self.paint(index)
+
+        # box borders over the cells, then the selection outline over everything
+        end = self.margin + self.size * cell_size
+        for line in range(0, self.size + 1, self.box_columns):
+            offset = self.margin + line * cell_size
+            self.create_line(offset, self.margin, offset, end, width=3)
+        for line in range(0, self.size + 1, self.box_rows):
+            offset = self.margin + line * cell_size
+            self.create_line(self.margin, offset, end, offset, width=3)
+        self.cursor = self.create_rectangle(0, 0, 0, 0, outline='blue', width=3, state=tk.HIDDEN)
+
+    def paint(self, index):
+        background, foreground = STYLES[self.styles[index]]
+        value = self.values[index]
+        self.itemconfigure(self.rectangles[index], fill=background)
+        self.itemconfigure(self.texts[index], fill=foreground,
+                           text='' if value == EMPTY_CELL_VALUE else symbol(value, self.size))
+
+        if self.show_candidates and value == EMPTY_CELL_VALUE:
+            separator = '' if self.size <= len(SYMBOLS) else ' '
+            text = separator.join(symbol(candidate, self.size) for candidate in self.candidates[index])
+            self.itemconfigure(self.candidate_texts[index], state=tk.NORMAL, text=text)
+        else:
+            self.itemconfigure(self.candidate_texts[index], state=tk.HIDDEN)
+
+    def mark(self, index):
+        self.dirty.add(index)
+        if self.pending is None:
+            self.pending = self.after_idle(self.flush)
+
+    def flush(self):
+        self.pending = None
+        dirty, self.dirty = self.dirty, set()
+        for index in dirty:
+            self.paint(index)
+
+    def style_of(self, cell):
+        if cell in self.session.conflicts:
+            return 'conflict'
+        if cell in self.session.solution:
+            return 'solved'
+        if cell.val == EMPTY_CELL_VALUE:
+            return 'empty'
+        return 'given' if cell in self.givens else 'entered'
+
+    def refresh(self, cell):
+        """ redraws a cell from its current value, possible moves and session state """
+        index = cell.row * self.size + cell.col
+        self.values[index] = cell.val
+        self.candidates[index] = list(cell.possible_moves)
+        self.styles[index] = self.style_of(cell)
+        self.mark(index)
+
+    def show_move(self, index, value, moves):
+        """ a solver move, possibly made on another thread and handed over by the caller """
+        self.values[index] = value
+        self.candidates[index] = list(moves)
+        self.styles[index] = 'solved' if value != EMPTY_CELL_VALUE else 'empty'
+        self.mark(index)
+
+    def set_show_candidates(self, show):
+        self.show_candidates = show
+        for index in range(self.size * self.size):
+            self.mark(index)
+
+    def select(self, index):
+        self.selected = index
+        self.entry = ''
+        x, y = self.origin(index)
+        self.coords(self.cursor, x, y, x + self.cell_size, y + self.cell_size)
+        self.itemconfigure(self.cursor, state=tk.NORMAL)
+
+    def on_click(self, event):
+        self.focus_set()
+        column = (event.x - self.margin) // self.cell_size
+        row = (event.y - self.margin) // self.cell_size
+        if 0 <= row < self.size and 0 <= column < self.size:
+            self.select(row * self.size + column)
+
+    def on_key(self, event):
+        if self.selected is None:
+            return
+
+        if event.keysym in MOVES:
+            row, column = divmod(self.selected, self.size)
+            step_row, step_column = MOVES[event.keysym]
+            self.select(((row + step_row) % self.size) * self.size + (column + step_column) % self.size)
+            return
+
+        cell = self.solver.cells[self.selected]
+        if not self.editable or cell in self.givens:
+            return
+
+        if event.keysym in CLEAR_KEYS and not (self.entry and event.char == '0'):
+            value = EMPTY_CELL_VALUE
+            self.entry = ''
+        elif self.size > len(SYMBOLS):
+            if not event.char.isdigit():
+                return
+            # a digit extends the number typed so far, or starts a new one once that would be out of range
+            self.entry = self.entry + event.char if int(self.entry + event.char) <= self.size else event.char
+            value = int(self.entry)
+            if not value:
+                self.entry = ''
+                return
+        else:
+            typed = event.char.upper()
+            if not typed or typed not in SYMBOLS[:self.size]:
+                return
+            value = SYMBOLS.index(typed) + 1
+
+        try:
+            self.on_edit(cell, value)
+        except ValueError:
+            self.bell()
@@ -0,0 +1,74 @@
+import threading
+import time
+
+NODES = 'nodes'
+TIME = 'time'
+CANCELLED = 'cancelled'
+
+
+class CancellationToken(object):
+    """ stops the searches given it once cancel() is called, from any thread """
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+
+class Budget(object):
+    """ what a search may spend: nodes, time until a time.monotonic() deadline, or until a token is
+        cancelled; the search calls exceeded() at every node and stops once it gives a reason """
+
+    def __init__(self, max_nodes=None, deadline=None, token=None):
+        self.max_nodes = max_nodes
+        self.deadline = deadline
+        self.token = token
+        self.reason = None
+
+    @classmethod
+    def create(cls, max_nodes=None, timeout=None, deadline=None, token=None):
+        """ None when nothing is limited, so searches without a budget skip the checks """
+        if timeout is not None:
+            deadline = min(deadline, time.monotonic() + timeout) if deadline is not None \
+                else time.monotonic() + timeout
+        if max_nodes is None and deadline is None and token is None:
+            return None
+        return cls(max_nodes, deadline, token)
+
+    def exceeded(self, nodes):
+        if self.reason is None:
+            if self.max_nodes is not None and nodes >= self.max_nodes:
+                self.reason = NODES
+            elif self.token is not None and self.token.cancelled:
+                self.reason = CANCELLED
+            elif self.deadline is not None and time.monotonic() >= self.deadline:
+                self.reason = TIME
+        return self.reason
+
+
+class BudgetExceeded(object):
+    """ solver status of a search that ran out of budget, falsy like a search that failed, with the
+        statistics of the search up to where it stopped """
+    __slots__ = ('reason', 'nodes', 'guesses', 'depth', 'elapsed')
+
+    def __init__(self, reason, nodes, guesses, depth, elapsed):
+        self.reason = reason
+        self.nodes = nodes
+        self.guesses = guesses
+        self.depth = depth
+        self.elapsed = elapsed
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return 'BudgetExceeded({!r}, nodes={}, guesses={}, depth={}, elapsed={:.3f})'.format(
+            self.reason, self.nodes, self.guesses, self.depth, self.elapsed)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
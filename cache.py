@@ -0,0 +1,77 @@
+import collections
+import sqlite3
+
+from SudokuSolver.canonical import canonical_form
+
+
+class SolutionCache(object):
+    """ solutions by canonical puzzle form, so a puzzle seen before in any relabelled, reordered or
+        transposed variant is answered without a search
+
+        the most recently used max_size entries are kept in memory; with a path they are also written
+        to a SQLite file that outlives the process and can be shared between worker processes.
+
+        every get and put canonicalises the puzzle first: about 0.4 ms for a 9x9 puzzle, up to 2 ms
+        when tied lines leave hundreds of orderings to try and 1-2 ms for 16x16 and 25x25. A hit
+        still costs more than that, because the solver replays the solution, so the cache pays
+        off for puzzles that take more than a few milliseconds to search """
+
+    def __init__(self, max_size=4096, path=None):
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path, timeout=30)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS solutions (puzzle BLOB PRIMARY KEY, solution BLOB)")
+            self.connection.commit()
+
+    def lookup(self, key):
+        solution = self.entries.get(key)
+        if solution is not None:
+            self.entries.move_to_end(key)
+            return solution
+
+        if self.connection is not None:
+            row = self.connection.execute("SELECT solution FROM solutions WHERE puzzle = ?", (key,)).fetchone()
+            if row is not None:
+                self.remember(key, row[0])
+                return row[0]
+
+        return None
+
+    def remember(self, key, solution):
+        self.entries[key] = solution
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def get(self, matrix, box=None):
+        """ cached solution of matrix as a flat list of values in the caller's orientation, None if unseen;
+            box is the (rows, columns) shape of its boxes when not the default one """
+        key, transform = canonical_form(matrix, box)
+        solution = self.lookup(key)
+
+        if solution is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return transform.restore(solution)
+
+    def put(self, matrix, solution, box=None):
+        """ stores the flat solution values of matrix under its canonical form """
+        key, transform = canonical_form(matrix, box)
+        canonical = bytes(transform.apply(solution))
+        self.remember(key, canonical)
+
+        if self.connection is not None:
+            self.connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?)", (key, canonical))
+            self.connection.commit()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
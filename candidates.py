@@ -0,0 +1,174 @@
+from SudokuSolver.grid import Grid
+
+EMPTY_CELL_VALUE = Grid.EMPTY_CELL_VALUE
+
+
+def mask_to_values(mask):
+    """ values whose bits are set in mask, bit (v - 1) standing for value v """
+    values = []
+    while mask:
+        low_bit = mask & -mask
+        values.append(low_bit.bit_length())
+        mask ^= low_bit
+    return values
+
+
+def count_bits(mask):
+    return bin(mask).count('1')
+
+
+class SetCandidates(object):
+    """ candidate engine that rebuilds the used values of the row, column and box on every lookup """
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.full_mask = (1 << grid.size) - 1
+        self.excluded = dict()
+
+    def reset(self, unit_masks=None):
+        self.excluded = dict()
+        # with constraints on the grid get() also drops the values they exclude
+        if self.grid.constraints:
+            self.get = self.constrained_get
+        else:
+            self.__dict__.pop('get', None)
+
+    def place(self, cell, old_value, new_value):
+        pass
+
+    def exclude(self, cell, mask):
+        self.excluded[cell] = self.excluded.get(cell, 0) | mask
+
+    def include(self, cell, mask):
+        self.excluded[cell] = self.excluded.get(cell, 0) & ~mask
+
+    def get(self, cell):
+        grid = self.grid
+        same_box_cells = grid.get_cells_in_same_box(cell)
+        same_col_cells = grid.get_cells_in_same_column(cell.col)
+        same_row_cells = grid.matrix[cell.row]
+
+        total_possible_values = [i + 1 for i in range(0, grid.size)]
+
+        valid_values = set(total_possible_values) - set(map(lambda x: x.val, same_box_cells)) - set(
+            map(lambda x: x.val, same_col_cells)) - set(map(lambda x: x.val, same_row_cells))
+
+        excluded = self.excluded.get(cell, 0)
+        if excluded:
+            return [value for value in valid_values if not excluded & (1 << (value - 1))]
+
+        return list(valid_values)
+
+    def constrained_get(self, cell):
+        excluded = self.grid.constraint_exclusions(cell.row * self.grid.size + cell.col)
+        return [value for value in SetCandidates.get(self, cell) if not excluded & (1 << (value - 1))]
+
+    def mask(self, cell):
+        mask = 0
+        for value in self.get(cell):
+            mask |= 1 << (value - 1)
+        return mask
+
+    def filled_in_row(self, row):
+        return len(list(filter(lambda x: x.val != EMPTY_CELL_VALUE, self.grid.matrix[row])))
+
+    def filled_in_column(self, column):
+        return len(list(filter(lambda x: x.val != EMPTY_CELL_VALUE, self.grid.get_cells_in_same_column(column))))
+
+    def filled_in_box(self, cell):
+        return len(list(filter(lambda x: x.val != EMPTY_CELL_VALUE, self.grid.get_cells_in_same_box(cell))))
+
+
+class BitmaskCandidates(object):
+    """ candidate engine keeping one used-values bitmask per row, column and box
+
+        bit (v - 1) of a mask is set while value v is placed in that unit, so placing or
+        clearing a value is O(1) and a lookup is a couple of ORs and a complement """
+
+    def __init__(self, grid):
+        self.grid = grid
+        size = grid.size
+        self.full_mask = (1 << size) - 1
+        self.rows = [0] * size
+        self.columns = [0] * size
+        self.boxes = [0] * size
+        # candidates ruled out by deduction rather than by a placed value, per [row][col]
+        self.excluded = [[0] * size for _ in range(size)]
+
+    def reset(self, unit_masks=None):
+        """ unit_masks, the (rows, columns, boxes) used-value masks of the givens as computed by
+            vectorized.unit_masks, saves the scan over the matrix """
+        size = len(self.rows)
+        self.excluded = [[0] * size for _ in range(size)]
+        # with constraints on the grid mask() also drops the values they exclude, without them the
+        # plain lookup runs
+        if self.grid.constraints:
+            self.mask = self.constrained_mask
+        else:
+            self.__dict__.pop('mask', None)
+
+        if unit_masks is not None:
+            self.rows, self.columns, self.boxes = ([int(mask) for mask in masks] for masks in unit_masks)
+            return
+
+        self.rows = [0] * size
+        self.columns = [0] * size
+        self.boxes = [0] * size
+
+        for row_cells in self.grid.matrix:
+            for cell in row_cells:
+                if cell.val != EMPTY_CELL_VALUE:
+                    self.place(cell, EMPTY_CELL_VALUE, cell.val)
+
+    def place(self, cell, old_value, new_value):
+        box_no = self.grid.get_box_no(cell.row, cell.col)
+
+        if old_value != EMPTY_CELL_VALUE:
+            keep = ~(1 << (old_value - 1))
+            self.rows[cell.row] &= keep
+            self.columns[cell.col] &= keep
+            self.boxes[box_no] &= keep
+
+        if new_value != EMPTY_CELL_VALUE:
+            bit = 1 << (new_value - 1)
+            self.rows[cell.row] |= bit
+            self.columns[cell.col] |= bit
+            self.boxes[box_no] |= bit
+
+    def exclude(self, cell, mask):
+        self.excluded[cell.row][cell.col] |= mask
+
+    def include(self, cell, mask):
+        self.excluded[cell.row][cell.col] &= ~mask
+
+    def mask(self, cell):
+        used = self.rows[cell.row] | self.columns[cell.col] | self.boxes[self.grid.get_box_no(cell.row, cell.col)]
+        return self.full_mask & ~(used | self.excluded[cell.row][cell.col])
+
+    def constrained_mask(self, cell):
+        excluded = self.grid.constraint_exclusions(cell.row * len(self.rows) + cell.col)
+        return BitmaskCandidates.mask(self, cell) & ~excluded
+
+    def get(self, cell):
+        return mask_to_values(self.mask(cell))
+
+    def filled_in_row(self, row):
+        return count_bits(self.rows[row])
+
+    def filled_in_column(self, column):
+        return count_bits(self.columns[column])
+
+    def filled_in_box(self, cell):
+        return count_bits(self.boxes[self.grid.get_box_no(cell.row, cell.col)])
+
+
+ENGINES = {
+    'set': SetCandidates,
+    'bitmask': BitmaskCandidates,
+}
+
+
+def create_engine(name, grid):
+    if name not in ENGINES:
+        raise ValueError("Unknown candidate engine '{}', expected one of {}".format(name, sorted(ENGINES)))
+    return ENGINES[name](grid)
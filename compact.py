@@ -0,0 +1,148 @@
+from SudokuSolver.candidates import count_bits, mask_to_values
+from SudokuSolver.grid import Grid
+from SudokuSolver.topology import get_topology
+
+EMPTY_CELL_VALUE = Grid.EMPTY_CELL_VALUE
+
+
+class CompactGrid(object):
+    """ headless grid state: a flat bytearray of values (0 for empty) plus used-value masks per row,
+        column and box; copy() is a handful of flat copies, so search can snapshot instead of undo
+
+        constraints, constraints.Constraint objects already attached to a grid of this size, are
+        copied along with the rest and their exclusions dropped from the candidates """
+    __slots__ = ('topology', 'values', 'rows', 'columns', 'boxes', 'constraints', 'constraints_of')
+
+    def __init__(self, size, values=None, box=None, constraints=()):
+        # row, column, box and peer indexes shared with every grid of this size and box shape
+        self.topology = get_topology(size, box)
+        self.values = bytearray(size * size)
+        self.rows = [0] * size
+        self.columns = [0] * size
+        self.boxes = [0] * size
+
+        # own copies of the constraints, emptied, and per cell the positions of those covering it
+        self.constraints = []
+        self.constraints_of = None
+        if constraints:
+            self.constraints_of = [[] for _ in range(size * size)]
+            for position, constraint in enumerate(constraints):
+                constraint = constraint.copy()
+                constraint.reset(bytes(size * size))
+                self.constraints.append(constraint)
+                for index in constraint.indexes:
+                    self.constraints_of[index].append(position)
+
+        for index, value in enumerate(values or ()):
+            if value:
+                self.place(index, value)
+
+    @classmethod
+    def from_matrix(cls, matrix, box=None, constraints=()):
+        return cls(len(matrix), [0 if value == EMPTY_CELL_VALUE else value for row in matrix for value in row], box,
+                   constraints)
+
+    @classmethod
+    def from_grid(cls, grid):
+        """ adapter from the Cell based Grid the GUI works on """
+        return cls.from_matrix([[cell.val for cell in row] for row in grid.matrix], grid.topology.box,
+                               grid.constraints)
+
+    def to_matrix(self):
+        size = self.topology.size
+        return [[value or EMPTY_CELL_VALUE for value in self.values[row * size:(row + 1) * size]]
+                for row in range(size)]
+
+    def copy(self):
+        grid = CompactGrid.__new__(CompactGrid)
+        grid.topology = self.topology
+        grid.values = bytearray(self.values)
+        grid.rows = self.rows[:]
+        grid.columns = self.columns[:]
+        grid.boxes = self.boxes[:]
+        grid.constraints = [constraint.copy() for constraint in self.constraints]
+        grid.constraints_of = self.constraints_of
+        return grid
+
+    def place(self, index, value):
+        topology = self.topology
+        bit = 1 << (value - 1)
+        self.values[index] = value
+        self.rows[topology.row_of[index]] |= bit
+        self.columns[topology.column_of[index]] |= bit
+        self.boxes[topology.box_of[index]] |= bit
+        if self.constraints_of:
+            for position in self.constraints_of[index]:
+                self.constraints[position].place(index, 0, value)
+
+    def candidates(self, index):
+        topology = self.topology
+        used = self.rows[topology.row_of[index]] | self.columns[topology.column_of[index]] | \
+            self.boxes[topology.box_of[index]]
+        if self.constraints_of:
+            for position in self.constraints_of[index]:
+                used |= self.constraints[position].excluded(index)
+        return topology.full_mask & ~used
+
+    def is_consistent(self):
+        """ no value repeats among the peers of a filled cell """
+        values = self.values
+        for index, peers in enumerate(self.topology.peers):
+            if values[index] and any(values[peer] == values[index] for peer in peers):
+                return False
+        return all(constraint.consistent(values) for constraint in self.constraints)
+
+    def most_constrained(self):
+        """ (index, candidate mask) of the empty cell with the fewest candidates, (None, 0) when full """
+        best_index, best_mask, best_count = None, 0, self.topology.size + 1
+
+        for index, value in enumerate(self.values):
+            if value:
+                continue
+            mask = self.candidates(index)
+            count = count_bits(mask)
+            if count < best_count:
+                best_index, best_mask, best_count = index, mask, count
+                if count < 2:
+                    break
+
+        return best_index, best_mask
+
+
+def search(grid, limit=1, shuffle=None, max_nodes=None, budget=None):
+    """ depth first search on snapshots: every branch gets its own copy of the grid, so nothing
+        is ever undone. Stops after limit solutions (None finds them all) and returns
+        (list of solved grids, number of grids tried).
+        shuffle, e.g. random.Random(seed).shuffle, randomizes the order values are tried in;
+        with max_nodes set the search gives up after trying that many grids, with a budget.Budget
+        once it is exceeded """
+    stack = [grid.copy()]
+    solutions = []
+    nodes = 0
+
+    while stack:
+        if max_nodes is not None and nodes >= max_nodes:
+            break
+        if budget is not None and budget.exceeded(nodes):
+            break
+
+        state = stack.pop()
+        index, mask = state.most_constrained()
+
+        if index is None:
+            solutions.append(state)
+            if len(solutions) == limit:
+                break
+            continue
+
+        values = mask_to_values(mask)
+        if shuffle:
+            shuffle(values)
+
+        for value in reversed(values):
+            child = state.copy()
+            child.place(index, value)
+            stack.append(child)
+            nodes += 1
+
+    return solutions, nodes
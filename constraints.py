@@ -0,0 +1,239 @@
+import abc
+import copy
+
+from SudokuSolver.candidates import mask_to_values
+
+
+class Constraint(abc.ABC):
+    """ base of the constraints registered on a Grid on top of its rows, columns and boxes
+
+        cells are (row, column) pairs, attach() turns them into flat row-major indexes. The engines
+        call place(index, old, new) for every value set or cleared in one of the cells, 0 standing for
+        empty, and drop excluded(index) from the candidates of an empty cell, so both keep incremental
+        state and stay cheap. consistent() checks the values placed so far, e.g. the givens or a
+        solution, copy() gives a copy with its own state for snapshot searches. all_different marks
+        a constraint that is just one more unit, the exact cover search takes those as columns """
+    all_different = False
+
+    def __init__(self, cells):
+        self.cells = [tuple(cell) for cell in cells]
+        self.size = 0
+        self.indexes = ()
+
+    def attach(self, size):
+        for row, column in self.cells:
+            if not (0 <= row < size and 0 <= column < size):
+                raise ValueError("Cell ({}, {}) outside a {}x{} grid".format(row, column, size, size))
+        self.size = size
+        self.indexes = tuple(row * size + column for row, column in self.cells)
+        self.reset([0] * (size * size))
+
+    def peers(self, index):
+        """ cells whose excluded values can change when index changes """
+        return self.indexes
+
+    @abc.abstractmethod
+    def reset(self, values):
+        """ state for flat values, 0 for empty """
+
+    @abc.abstractmethod
+    def place(self, index, old_value, new_value):
+        """ new_value replaces old_value at index """
+
+    @abc.abstractmethod
+    def excluded(self, index):
+        """ mask of the values, bit (v - 1) for v, that index cannot take """
+
+    @abc.abstractmethod
+    def consistent(self, values):
+        """ True when the values placed so far break nothing """
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+
+class Unit(Constraint):
+    """ extra all-different unit, e.g. a diagonal or a jigsaw region """
+    all_different = True
+
+    def reset(self, values):
+        self.counts = [0] * (self.size + 1)
+        self.used = 0
+        for index in self.indexes:
+            if values[index]:
+                self.place(index, 0, values[index])
+
+    def place(self, index, old_value, new_value):
+        counts = self.counts
+        if old_value:
+            counts[old_value] -= 1
+            if not counts[old_value]:
+                self.used &= ~(1 << (old_value - 1))
+        if new_value:
+            counts[new_value] += 1
+            self.used |= 1 << (new_value - 1)
+
+    def excluded(self, index):
+        return self.used
+
+    def consistent(self, values):
+        placed = [values[index] for index in self.indexes if values[index]]
+        return len(placed) == len(set(placed))
+
+    def copy(self):
+        unit = copy.copy(self)
+        unit.counts = self.counts[:]
+        return unit
+
+
+class Diagonal(Unit):
+    """ the main diagonal, top left to bottom right, or with anti set the other one """
+
+    def __init__(self, anti=False):
+        super().__init__([])
+        self.anti = anti
+
+    def attach(self, size):
+        self.cells = [(row, size - 1 - row if self.anti else row) for row in range(size)]
+        super().attach(size)
+
+
+class Cage(Constraint):
+    """ killer cage: distinct values adding up to total """
+
+    def __init__(self, cells, total):
+        super().__init__(cells)
+        self.total = total
+
+    def reset(self, values):
+        self.used = 0
+        self.filled = 0
+        self.sum = 0
+        for index in self.indexes:
+            if values[index]:
+                self.place(index, 0, values[index], update=False)
+        self.update()
+
+    def place(self, index, old_value, new_value, update=True):
+        if old_value:
+            self.used &= ~(1 << (old_value - 1))
+            self.filled -= 1
+            self.sum -= old_value
+        if new_value:
+            self.used |= 1 << (new_value - 1)
+            self.filled += 1
+            self.sum += new_value
+        if update:
+            self.update()
+
+    def update(self):
+        """ works out the excluded values, the same for every empty cell of the cage: those already in
+            it and those after which the other empty cells cannot make up the rest of the total with
+            distinct unused values """
+        free = mask_to_values(((1 << self.size) - 1) & ~self.used)
+        others = len(self.indexes) - self.filled - 1
+        remaining = self.total - self.sum
+        excluded = self.used
+
+        for value in free:
+            rest = remaining - value
+            if rest < 0 or others < 0:
+                excluded |= 1 << (value - 1)
+                continue
+            # sums[count]: bit s set when count distinct free values other than value add up to s
+            sums = [1] + [0] * others
+            for other in free:
+                if other != value:
+                    for count in range(others, 0, -1):
+                        sums[count] |= sums[count - 1] << other
+            if not sums[others] >> rest & 1:
+                excluded |= 1 << (value - 1)
+
+        self.excluded_mask = excluded
+
+    def excluded(self, index):
+        return self.excluded_mask
+
+    def consistent(self, values):
+        placed = [values[index] for index in self.indexes if values[index]]
+        if len(placed) != len(set(placed)):
+            return False
+        if len(placed) == len(self.indexes):
+            return sum(placed) == self.total
+        return sum(placed) < self.total
+
+    def copy(self):
+        return copy.copy(self)
+
+
+class Thermometer(Constraint):
+    """ values strictly increasing from the bulb, the first cell, to the tip """
+
+    def reset(self, values):
+        self.position = dict((index, position) for position, index in enumerate(self.indexes))
+        self.values = [values[index] for index in self.indexes]
+        self.update()
+
+    def place(self, index, old_value, new_value):
+        self.values[self.position[index]] = new_value
+        self.update()
+
+    def update(self):
+        """ works out the excluded values of every cell after a change """
+        full_mask = (1 << self.size) - 1
+        self.masks = []
+        for position in range(len(self.values)):
+            low, high = self.bounds(position)
+            if low > high:
+                self.masks.append(full_mask)
+            else:
+                # bits below low and above high
+                self.masks.append(((1 << (low - 1)) - 1) | (full_mask & ~((1 << high) - 1)))
+
+    def bounds(self, position):
+        """ lowest and highest value the cell at position can take given the placed ones """
+        low, high = position + 1, self.size - (len(self.values) - 1 - position)
+        for other, value in enumerate(self.values):
+            if not value or other == position:
+                continue
+            if other < position:
+                low = max(low, value + position - other)
+            else:
+                high = min(high, value - (other - position))
+        return low, high
+
+    def excluded(self, index):
+        return self.masks[self.position[index]]
+
+    def consistent(self, values):
+        placed = [(position, values[index]) for position, index in enumerate(self.indexes) if values[index]]
+        return all(value_b - value_a >= position_b - position_a
+                   for (position_a, value_a), (position_b, value_b) in zip(placed, placed[1:]))
+
+    def copy(self):
+        thermometer = copy.copy(self)
+        thermometer.values = self.values[:]
+        thermometer.masks = self.masks[:]
+        return thermometer
+
+
+def diagonals():
+    """ both diagonals, the X of an X-sudoku """
+    return [Diagonal(), Diagonal(anti=True)]
+
+
+def jigsaw(layout):
+    """ one Unit per region of layout, a matrix or row-major string with a region label per cell;
+        for a jigsaw puzzle the grid's own boxes are switched off with Grid(box=(1, size)) """
+    labels = [label for row in layout for label in row]
+    size = int(round(len(labels) ** 0.5))
+    if size * size != len(labels):
+        raise ValueError("Layout of {} cells is not a square grid".format(len(labels)))
+
+    regions = dict()
+    for index, label in enumerate(labels):
+        regions.setdefault(label, []).append(divmod(index, size))
+    if any(len(cells) != size for cells in regions.values()):
+        raise ValueError("Every jigsaw region needs {} cells".format(size))
+
+    return [Unit(cells) for _, cells in sorted(regions.items())]
@@ -0,0 +1,246 @@
+from SudokuSolver.grid import Grid
+
+EMPTY_CELL_VALUE = Grid.EMPTY_CELL_VALUE
+
+
+class DancingLinks(object):
+    """ Knuth's Algorithm X on dancing links over the exact cover form of a grid
+
+        a size N grid has 4 * N^2 constraint columns: every cell holds one value and every row,
+        column and box holds every value once. Columns already satisfied by the givens are left
+        out and only candidate rows that agree with the givens are linked in. all_different
+        constraints of size cells registered on the grid add a column per value like any unit, the
+        other constraints stay outside the matrix: the search places its rows in them, skips the
+        rows whose value they exclude at the time and counts only the others when picking a column.
+
+        the links live in flat int lists indexed by node, node 0 being the root header """
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.nodes = 0
+
+        size = grid.size
+        # per cell the numbers of the extra units on it, each owning size columns after the 4 * N^2,
+        # and the other constraints on it
+        self.units = [[] for _ in range(size * size)]
+        self.filtered = [[] for _ in range(size * size)]
+        self.extra = 0
+        for constraint in grid.constraints:
+            if constraint.all_different and len(constraint.indexes) == size:
+                for index in constraint.indexes:
+                    self.units[index].append(self.extra)
+                self.extra += 1
+            else:
+                for index in constraint.indexes:
+                    self.filtered[index].append(constraint)
+        self.constrained = any(self.filtered)
+
+        givens = []
+        used = set()
+        for row, row_cells in enumerate(grid.matrix):
+            for column, cell in enumerate(row_cells):
+                if cell.val != EMPTY_CELL_VALUE:
+                    givens.append(cell)
+                    used.update(self.constraints(row, column, cell.val, size))
+
+        constraint_columns = [constraint for constraint in range((4 * size + self.extra) * size)
+                              if constraint not in used]
+        column_of = dict((constraint, index + 1) for index, constraint in enumerate(constraint_columns))
+        headers = len(constraint_columns) + 1
+
+        self.left = [index - 1 for index in range(headers)]
+        self.right = [index + 1 for index in range(headers)]
+        self.left[0] = headers - 1
+        self.right[headers - 1] = 0
+        self.up = list(range(headers))
+        self.down = list(range(headers))
+        self.column = list(range(headers))
+        self.size = [0] * headers
+        self.choice = [None] * headers
+
+        for row, row_cells in enumerate(grid.matrix):
+            for column, cell in enumerate(row_cells):
+                if cell.val != EMPTY_CELL_VALUE:
+                    continue
+                for value in range(1, size + 1):
+                    constraints = self.constraints(row, column, value, size)
+                    if any(constraint in used for constraint in constraints):
+                        continue
+                    self.add_row((row, column, value), [column_of[constraint] for constraint in constraints])
+
+    def constraints(self, row, column, value, size):
+        box_no = self.grid.get_box_no(row, column)
+        digit = value - 1
+        constraints = (row * size + column,
+                       size * size + row * size + digit,
+                       2 * size * size + column * size + digit,
+                       3 * size * size + box_no * size + digit)
+        units = self.units[row * size + column]
+        if units:
+            constraints += tuple(4 * size * size + unit * size + digit for unit in units)
+        return constraints
+
+    def add_row(self, choice, header_nodes):
+        first = len(self.column)
+
+        for offset, header in enumerate(header_nodes):
+            node = first + offset
+            self.left.append(node - 1 if offset else first + len(header_nodes) - 1)
+            self.right.append(node + 1 if offset < len(header_nodes) - 1 else first)
+            self.up.append(self.up[header])
+            self.down.append(header)
+            self.down[self.up[header]] = node
+            self.up[header] = node
+            self.column.append(header)
+            self.choice.append(choice)
+            self.size[header] += 1
+
+    def cover(self, header):
+        left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+
+        right[left[header]] = right[header]
+        left[right[header]] = left[header]
+
+        row_node = down[header]
+        while row_node != header:
+            node = right[row_node]
+            while node != row_node:
+                down[up[node]] = down[node]
+                up[down[node]] = up[node]
+                size[column[node]] -= 1
+                node = right[node]
+            row_node = down[row_node]
+
+    def uncover(self, header):
+        left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+
+        row_node = up[header]
+        while row_node != header:
+            node = left[row_node]
+            while node != row_node:
+                size[column[node]] += 1
+                down[up[node]] = node
+                up[down[node]] = node
+                node = left[node]
+            row_node = up[row_node]
+
+        right[left[header]] = header
+        left[right[header]] = header
+
+    def select(self, row_node):
+        self.nodes += 1
+        node = self.right[row_node]
+        while node != row_node:
+            self.cover(self.column[node])
+            node = self.right[node]
+
+    def deselect(self, row_node):
+        node = self.left[row_node]
+        while node != row_node:
+            self.uncover(self.column[node])
+            node = self.left[node]
+
+    def allowed(self, row_node, header):
+        """ first row from row_node down that the filtered constraints allow, header when there is none """
+        size, down, choice, filtered = self.grid.size, self.down, self.choice, self.filtered
+        while row_node != header:
+            row, column, value = choice[row_node]
+            index = row * size + column
+            bit = 1 << (value - 1)
+            for constraint in filtered[index]:
+                if constraint.excluded(index) & bit:
+                    break
+            else:
+                return row_node
+            row_node = down[row_node]
+        return header
+
+    def place(self, row_node, placed):
+        """ passes a selected or deselected row on to the filtered constraints """
+        row, column, value = self.choice[row_node]
+        index = row * self.grid.size + column
+        old_value, new_value = (0, value) if placed else (value, 0)
+        for constraint in self.filtered[index]:
+            constraint.place(index, old_value, new_value)
+
+    def smallest_allowed_column(self):
+        """ smallest_column counting only the rows the filtered constraints allow, so a column they
+            emptied is picked, and failed, straight away """
+        right, down, allowed = self.right, self.down, self.allowed
+        best, best_count = right[0], None
+        header = best
+        while header != 0:
+            count = 0
+            row_node = allowed(down[header], header)
+            while row_node != header:
+                count += 1
+                if best_count is not None and count >= best_count:
+                    break
+                row_node = allowed(down[row_node], header)
+            if best_count is None or count < best_count:
+                best, best_count = header, count
+                if count < 2:
+                    break
+            header = right[header]
+        return best
+
+    def smallest_column(self):
+        right, size = self.right, self.size
+        best = header = right[0]
+        while header != 0:
+            if size[header] < size[best]:
+                best = header
+                if size[best] < 2:
+                    break
+            header = right[header]
+        return best
+
+    def solutions(self, budget=None):
+        """ yields each solution as a list of (row, column, value) for the empty cells; a budget.Budget
+            stops the search once it is exceeded, counting the selected rows as nodes """
+        stack = []
+        constrained = self.constrained
+
+        while True:
+            if budget is not None and budget.exceeded(self.nodes):
+                return
+
+            if self.right[0] == 0:
+                yield [self.choice[row_node] for row_node in stack]
+                descend = False
+            else:
+                header = self.smallest_allowed_column() if constrained else self.smallest_column()
+                self.cover(header)
+                row_node = self.down[header]
+                if constrained:
+                    row_node = self.allowed(row_node, header)
+                if row_node != header:
+                    stack.append(row_node)
+                    self.select(row_node)
+                    if constrained:
+                        self.place(row_node, True)
+                    descend = True
+                else:
+                    self.uncover(header)
+                    descend = False
+
+            while not descend:
+                if not stack:
+                    return
+
+                row_node = stack.pop()
+                if constrained:
+                    self.place(row_node, False)
+                self.deselect(row_node)
+                header = self.column[row_node]
+                row_node = self.down[row_node]
+                if constrained:
+                    row_node = self.allowed(row_node, header)
+                if row_node != header:
+                    stack.append(row_node)
+                    self.select(row_node)
+                    if constrained:
+                        self.place(row_node, True)
+                    descend = True
+                else:
+                    self.uncover(header)
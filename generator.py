@@ -0,0 +1,184 @@
+import argparse
+import multiprocessing
+import random
+
+from SudokuSolver import compact
+from SudokuSolver.candidates import mask_to_values
+from SudokuSolver.grading import grade
+from SudokuSolver.grid import Grid
+from SudokuSolver.puzzle_io import PuzzleWriter, format_grid
+from SudokuSolver.solver import Solver
+from SudokuSolver.topology import box_shape
+
+EMPTY_CELL_VALUE = Grid.EMPTY_CELL_VALUE
+
+# clues left in a 9x9 puzzle per difficulty, scaled by cell count for other sizes; digging stops
+# earlier when no further clue can go without losing uniqueness
+DIFFICULTIES = {'easy': 40, 'medium': 32, 'hard': 27, 'expert': 22}
+
+# grids the random fill may try per row of the grid before it falls back to a shuffled pattern
+SEARCH_BUDGET = 100
+
+# rows the dancing links count of a uniqueness check may try per cell of the grid; a clue whose removal
+# cannot be settled within it is kept
+COUNT_BUDGET = 2
+
+_worker_options = dict()
+
+
+def clue_target(size, clues=None, difficulty='medium'):
+    if clues is not None:
+        return clues
+    if difficulty not in DIFFICULTIES:
+        raise ValueError("Unknown difficulty '{}', expected one of {}".format(difficulty, sorted(DIFFICULTIES)))
+    return int(round(DIFFICULTIES[difficulty] * size * size / 81.0))
+
+
+def pattern_solution(size, rng):
+    """ a complete grid from the shifted-rows pattern, shuffled by the moves that keep a grid valid:
+        relabelling values, permuting rows within a band, bands, columns within a stack and stacks """
+    box_rows, box_columns = box_shape(size)
+
+    def shuffled_lines(width):
+        bands = list(range(size // width))
+        rng.shuffle(bands)
+        lines = []
+        for band in bands:
+            offsets = list(range(width))
+            rng.shuffle(offsets)
+            lines.extend(band * width + offset for offset in offsets)
+        return lines
+
+    labels = list(range(1, size + 1))
+    rng.shuffle(labels)
+    rows, columns = shuffled_lines(box_rows), shuffled_lines(box_columns)
+
+    return [labels[(box_columns * (row % box_rows) + row // box_rows + column) % size]
+            for row in rows for column in columns]
+
+
+def random_solution(size, rng):
+    """ a random complete grid: the snapshot search run on an empty grid, trying values in random order.
+        Large grids can send it down a dead branch for a long time, after a node budget they fall back to
+        pattern_solution """
+    solutions, _ = compact.search(compact.CompactGrid(size), shuffle=rng.shuffle, max_nodes=SEARCH_BUDGET * size)
+    if solutions:
+        return list(solutions[0].values)
+    return pattern_solution(size, rng)
+
+
+def keeps_unique(values, size, index):
+    """ True when the puzzle values, unique so far, stays unique with the clue at index removed:
+        no other candidate of that cell can be completed to a solution.
+
+        the snapshot search settles most cells within its node budget; when it runs out the whole
+        puzzle is counted on dancing links instead, within a budget of its own. A count that runs out
+        as well leaves the question open and the clue is kept, so the puzzle stays unique """
+    value = values[index]
+    puzzle = values[:index] + [0] + values[index + 1:]
+    grid = compact.CompactGrid(size, puzzle)
+    # a snapshot costs about a pass over the cells, so larger grids get fewer of them before dancing
+    # links takes over; 9x9 keeps SEARCH_BUDGET per row
+    budget = SEARCH_BUDGET * 81 // size
+
+    for other in mask_to_values(grid.candidates(index) & ~(1 << (value - 1))):
+        trial = grid.copy()
+        trial.place(index, other)
+        solutions, nodes = compact.search(trial, max_nodes=budget)
+        if solutions:
+            return False
+        if nodes >= budget:
+            matrix = [[value or EMPTY_CELL_VALUE for value in puzzle[row * size:(row + 1) * size]]
+                      for row in range(size)]
+            solver = Solver(matrix=matrix, size=size, backend='dlx', max_nodes=COUNT_BUDGET * size * size)
+            return solver.count_solutions(limit=2) == 1 and not solver.out_of_budget()
+
+    return True
+
+
+def generate(size=9, clues=None, difficulty='medium', seed=None):
+    """ a random puzzle with a unique solution as a matrix, -1 for empty cells
+
+        clues removed one at a time in random order, each kept when removing it would allow a second
+        solution, until clues (or the difficulty's clue count) are left. The same seed gives the same puzzle """
+    rng = random.Random(seed)
+    target = clue_target(size, clues, difficulty)
+
+    values = random_solution(size, rng)
+    order = list(range(size * size))
+    rng.shuffle(order)
+
+    remaining = len(values)
+    for index in order:
+        if remaining <= target:
+            break
+        if keeps_unique(values, size, index):
+            values[index] = 0
+            remaining -= 1
+
+    return [[value or EMPTY_CELL_VALUE for value in values[row * size:(row + 1) * size]] for row in range(size)]
+
+
+def _init_worker(options):
+    _worker_options.clear()
+    _worker_options.update(options)
+
+
+def _generate_indexed(seed):
+    options = dict(_worker_options)
+    graded = options.pop('grade', False)
+    matrix = generate(seed=seed, **options)
+    return (matrix, grade(matrix)) if graded else matrix
+
+
+def generate_many(count, seed=None, workers=None, chunksize=16, **options):
+    """ yields count puzzles in order, generated on a pool of worker processes
+
+        puzzle i is generate(seed='<seed>:<i>'), so a seed reproduces the whole run whatever the number
+        of workers. workers=1 generates in this process, None uses one worker per core.
+        grade=True yields (matrix, grading.grade(matrix)) pairs, graded in the workers.
+        other options are passed on to generate (size, clues, difficulty) """
+    if seed is None:
+        seed = random.randrange(1 << 32)
+    seeds = ('{}:{}'.format(seed, index) for index in range(count))
+
+    if workers == 1:
+        _init_worker(options)
+        for puzzle_seed in seeds:
+            yield _generate_indexed(puzzle_seed)
+        return
+
+    with multiprocessing.Pool(processes=workers, initializer=_init_worker, initargs=(options,)) as pool:
+        for puzzle in pool.imap(_generate_indexed, seeds, chunksize):
+            yield puzzle
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate puzzles with a unique solution, one per line")
+    parser.add_argument('-n', '--count', type=int, default=1, help="number of puzzles")
+    parser.add_argument('-o', '--output', default='-', help="output file, '-' for stdout")
+    parser.add_argument('-s', '--size', type=int, default=9,
+                        help="grid size that splits into boxes, e.g. 4, 6, 9, 12, 16 or 25")
+    parser.add_argument('--clues', type=int, help="clues to leave, overrides --difficulty")
+    parser.add_argument('--difficulty', default='medium', choices=sorted(DIFFICULTIES))
+    parser.add_argument('--seed', help="reproduces the same puzzles")
+    parser.add_argument('-w', '--workers', type=int, help="worker processes, defaults to one per core")
+    parser.add_argument('-c', '--chunksize', type=int, default=16, help="puzzles per task sent to a worker")
+    parser.add_argument('--grade', action='store_true', help="write JSON records with each puzzle's grade")
+    args = parser.parse_args(argv)
+
+    puzzles = generate_many(args.count, seed=args.seed, workers=args.workers, chunksize=args.chunksize,
+                            grade=args.grade, size=args.size, clues=args.clues, difficulty=args.difficulty)
+
+    with PuzzleWriter(args.output) as writer:
+        for puzzle in puzzles:
+            if args.grade:
+                matrix, record = puzzle
+                record['puzzle'] = format_grid(matrix)
+                writer.write_record(record)
+            else:
+                writer.write_grid(puzzle)
+
+
+if __name__ == '__main__':
+    main()
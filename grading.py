@@ -0,0 +1,53 @@
+import math
+
+from SudokuSolver.solver import Solver
+
+# the propagation rules in the order a person would reach for them, each with its rating, loosely after
+# the Sudoku Explainer scale; a puzzle is rated by the hardest one it needed
+TECHNIQUES = ('naked_singles', 'hidden_singles', 'pointing', 'naked_pairs', 'x_wing', 'hidden_pairs')
+RATINGS = {'naked_singles': 1.0, 'hidden_singles': 1.5, 'pointing': 1.7, 'naked_pairs': 3.0, 'x_wing': 3.2,
+           'hidden_pairs': 3.4}
+
+# puzzles the techniques cannot finish start at this rating and gain log2(1 + branches) on top
+SEARCH = 'search'
+SEARCH_RATING = 5.0
+
+
+def rate(histogram, branches):
+    """ (score, hardest technique) for a technique histogram and the number of search branches """
+    if branches:
+        return SEARCH_RATING + math.log2(1 + branches), SEARCH
+
+    used = [technique for technique in TECHNIQUES if histogram.get(technique)]
+    if not used:
+        return 0.0, None
+
+    hardest = max(used, key=RATINGS.get)
+    return RATINGS[hardest], hardest
+
+
+def grade(matrix):
+    """ solves matrix once with every technique enabled, easiest first, and returns its grade:
+        score, hardest technique, histogram of the deductions each technique made before the first
+        guess, branches the search still had to try, the deductions made inside the search (abandoned
+        branches included) and whether it was solved """
+    solver = Solver(matrix=[row[:] for row in matrix], size=len(matrix), propagation=TECHNIQUES)
+    validation_status = solver.prepare()
+    solver_status = False
+    histogram = dict((technique, 0) for technique in TECHNIQUES)
+
+    if validation_status:
+        # the techniques alone first, their histogram is what a person solving it would need
+        solver_status = solver.propagate()
+        histogram = dict(solver.propagator.removed)
+        if solver_status:
+            solver_status = solver.solve_iteratively()
+
+    report = solver.propagation_report()
+    branches = report.pop('guesses')
+    search = dict((technique, report[technique] - histogram[technique]) for technique in TECHNIQUES)
+    score, technique = rate(histogram, branches)
+
+    return {'score': score, 'technique': technique, 'histogram': histogram, 'branches': branches,
+            'search_histogram': search, 'nodes': solver.total_moves,
+            'solved': bool(validation_status and solver_status)}
@@ -1,8 +1,11 @@
-import math
 import random
 
+from SudokuSolver.topology import get_topology
+
 
 class Cell(object):
+    __slots__ = ('val', 'row', 'col', 'row_w', 'col_w', 'box_w', 'wt', 'possible_moves', 'label', 'moves_label')
+
     def __init__(self, val, row, col, row_w=0, col_w=0, box_w=0, wt=0):
         self.val = val
         self.row = row
@@ -21,7 +24,6 @@ class Grid(object):
 
     def __init__(self, gui=None, **kwargs):
 
-        print(kwargs)
         matrix = kwargs.get('matrix', [])
         size = kwargs.get('size', 9)
 
@@ -30,20 +32,22 @@ class Grid(object):
         if not matrix:
             is_empty = True
 
-        self.const = int(math.sqrt(size))
+        # box is the (rows, columns) shape of a box, by default topology.box_shape(size): 3x3 for 9x9,
+        # 2x3 for 6x6, 3x4 for 12x12
+        self.topology = get_topology(size, kwargs.get('box'))
+        self.size = size
+        self.box_rows, self.box_columns = self.topology.box
         self.moves = []
         self.required_moves = 0
 
         self.matrix = []
-        self.same_column_cells = dict()
-        self.same_box_cells = dict()
 
         self.gui = gui
         self.total_moves = 0
 
-        for row in range(0, (self.const ** 2)):
+        for row in range(0, size):
             self.matrix.append([])
-            for col in range(0, (self.const ** 2)):
+            for col in range(0, size):
                 if is_empty:
                     val = -1
                 else:
@@ -53,30 +57,72 @@ class Grid(object):
 
                 self.matrix[row].append(cell)
 
-    def initialize(self):
-        for row, row_cells in enumerate(self.matrix):
-            for column, cell in enumerate(row_cells):
-                if cell.val == -1:
-                    self.required_moves += 1
-
-                if column not in self.same_column_cells:
-                    self.same_column_cells[column] = []
-                self.same_column_cells[column].append(cell)
-
-                box_no = self.get_box_no(row, column)
+        # row-major list of the cells, indexed like the topology tables
+        self.cells = [cell for row_cells in self.matrix for cell in row_cells]
+        self.same_column_cells = dict((column, [self.cells[index] for index in indexes])
+                                      for column, indexes in enumerate(self.topology.columns))
+        self.same_box_cells = dict((box_no, [self.cells[index] for index in indexes])
+                                   for box_no, indexes in enumerate(self.topology.boxes))
+
+        # constraints.Constraint plugins on top of rows, columns and boxes, see add_constraint; the per cell
+        # tables are only built once there is one
+        self.constraints = []
+        self.constraints_of = None
+        self.constraint_peers = None
+        for constraint in kwargs.get('constraints', ()):
+            self.add_constraint(constraint)
+
+    def add_constraint(self, constraint):
+        """ registers a constraints.Constraint, or a list of them such as constraints.diagonals() returns """
+        if isinstance(constraint, (list, tuple)):
+            for each in constraint:
+                self.add_constraint(each)
+            return
+
+        if self.constraints_of is None:
+            self.constraints_of = [[] for _ in self.cells]
+            self.constraint_peers = [set() for _ in self.cells]
+
+        constraint.attach(self.size)
+        self.constraints.append(constraint)
+        for index in constraint.indexes:
+            self.constraints_of[index].append(constraint)
+            self.constraint_peers[index].update(peer for peer in constraint.peers(index) if peer != index)
+
+    def constraint_values(self):
+        return [0 if cell.val == -1 else cell.val for cell in self.cells]
+
+    def reset_constraints(self):
+        """ brings the constraints in line with the matrix, False when its values already break one """
+        values = self.constraint_values()
+        for constraint in self.constraints:
+            constraint.reset(values)
+        return all(constraint.consistent(values) for constraint in self.constraints)
+
+    def place_constraints(self, index, old_value, new_value):
+        """ passes a change of the cell at index on to its constraints, -1 or 0 meaning empty """
+        old_value, new_value = max(old_value, 0), max(new_value, 0)
+        for constraint in self.constraints_of[index]:
+            constraint.place(index, old_value, new_value)
+
+    def constraint_exclusions(self, index):
+        """ mask of the values the constraints on the cell at index rule out """
+        excluded = 0
+        for constraint in self.constraints_of[index]:
+            excluded |= constraint.excluded(index)
+        return excluded
 
-                if box_no not in self.same_box_cells:
-                    self.same_box_cells[box_no] = []
-
-                self.same_box_cells[box_no].append(cell)
+    def initialize(self):
+        for cell in self.cells:
+            if cell.val == -1:
+                self.required_moves += 1
 
     def get_box_no(self, row, col):
-        row_index = row - row % self.const
-        col_index = col - col % self.const
+        return self.topology.box_of[row * len(self.matrix) + col]
 
-        box_no = row_index + int(col_index / self.const)
-
-        return box_no
+    def get_peers(self, cell):
+        cells = self.cells
+        return [cells[index] for index in self.topology.peers[cell.row * len(self.matrix) + cell.col]]
 
     def get_cells_in_same_box(self, cell):
 
@@ -98,20 +144,21 @@ class Grid(object):
         column_cells = dict()
         box_cells = dict()
         for row, row_cells_objs in enumerate(self.matrix):
-            row_cells = dict()
+            row_cells = set()
             for column, cell in enumerate(row_cells_objs):
                 if cell.val == -1:
                     self.required_moves += 1
 
+                # values outside 1..size can never be part of a solution
+                elif not 1 <= cell.val <= self.size:
+                    return False
+
                 # duplicate check on row
                 if cell.val != Grid.EMPTY_CELL_VALUE:
-                    if cell.col not in row_cells:
-                        row_cells[cell.col] = set()
-
-                    if cell.val in row_cells[cell.col]:
+                    if cell.val in row_cells:
                         return False
 
-                    row_cells[cell.col].add(cell.val)
+                    row_cells.add(cell.val)
 
                 # duplicate check on column
                 if cell.val != Grid.EMPTY_CELL_VALUE:
@@ -134,36 +181,14 @@ class Grid(object):
 
                     box_cells[box_no].add(cell.val)
 
-                # Initialize
-                if column not in self.same_column_cells:
-                    self.same_column_cells[column] = []
-                self.same_column_cells[column].append(cell)
-
-                box_no = self.get_box_no(row, column)
-
-                if box_no not in self.same_box_cells:
-                    self.same_box_cells[box_no] = []
-
-                self.same_box_cells[box_no].append(cell)
-
         return True
 
     @staticmethod
-    def get_random_sudoku():
-        matrix = [[-1, -1, -1, -1, -1, -1, -1, -1, -1],
-                  [-1, -1, -1, -1, -1, -1, -1, -1, -1],
-                  [-1, -1, -1, -1, -1, 1, -1, -1, -1],
-                  [-1, -1, -1, -1, -1, -1, -1, -1, -1],
-                  [-1, -1, -1, -1, -1, -1, -1, -1, -1],
-                  [-1, -1, -1, -1, -1, -1, -1, -1, -1],
-                  [-1, -1, -1, -1, -1, -1, -1, -1, -1],
-                  [-1, -1, -1, -1, -1, -1, -1, -1, -1],
-                  [-1, -1, -1, -1, -1, -1, 1, -1, -1]]
-
-    considered_box = []
-    considered_row = []
-
-    pass
+    def get_random_sudoku(size=9, clues=None, difficulty='medium', seed=None):
+        """ a freshly generated puzzle with a unique solution, see generator.generate """
+        from SudokuSolver.generator import generate
+
+        return generate(size, clues, difficulty, seed)
 
     @staticmethod
     def get_sample_sudoku():
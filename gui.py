@@ -1,35 +1,22 @@
+import logging
 import time
 import tkinter as tk
 
+from SudokuSolver.board import CanvasBoard
+from SudokuSolver.budget import BudgetExceeded
+from SudokuSolver.session import Session
 from SudokuSolver.solver import Solver
+from SudokuSolver.worker import GenerateWorker, SolveWorker
 
+logger = logging.getLogger(__name__)
 
-class CustomText(tk.Text):
-    def __init__(self, cell, *args, **kwargs):
-        """A text widget that report on internal widget commands"""
-        tk.Text.__init__(self, *args, **kwargs)
+# how often the board is redrawn from the solver's queued moves while a solve runs
+FRAME_MS = 20
 
-        # create a proxy for the underlying widget
-        self.cell = cell
-        self._orig = self._w + "_orig"
-        self.tk.call("rename", self._w, self._orig)
-        self.tk.createcommand(self._w, self._proxy)
-
-    def insert(self, text=''):
-        self.delete("1.0", tk.END)
-        super().insert("1.0", text, "center")
-
-    def _proxy(self, command, *args):
-        cmd = (self._orig, command) + args
-        result = self.tk.call(cmd)
-
-        if command in ("insert", "replace"):
-            self.event_generate("<<TextModified>>")
-
-        if command == 'delete':
-            self.event_generate("<<TextDeleted>>")
-
-        return result
+# sizes offered for new and random boards, boxes as topology.box_shape gives them: 2x3 for 6, 3x4 for 12;
+# a random 25x25 board takes half a minute to generate and the solver the GUI animates does not finish
+# on the larger grids
+BOARD_SIZES = (4, 6, 9, 12, 16, 25)
 
 
 class Application(tk.Frame):
@@ -37,186 +24,181 @@ class Application(tk.Frame):
         super().__init__(master)
 
         self.solver = None
+        self.session = None
+        self.worker = None
+        self.generator = None
+        self.pause_bt = None
         self.master = master
         self.slider = None
         self.status_label = None
         self.show_possible_moves = None
+        self.board_size = None
+        self.board = None
 
         self.create_widgets()
-        self.sudoku_cell_gui_objs = []
 
     def load_sample_sudoku(self, frame):
+        if self.worker or self.generator:
+            return
+
         sample_sudoku = Solver.get_sample_sudoku()
         self.solver = Solver(gui=self, **{'matrix': sample_sudoku, 'size': len(sample_sudoku)})
+        self.session = Session(self.solver)
         self.create_sudoku_layout(frame)
 
-    def create_empty_sudoku(self, frame, size=9):
-        self.solver = Solver(gui=self, **{'matrix': [], 'size': size})
-        self.create_sudoku_layout(frame)
-
-    def retrieve_input(self, frame):
-        childrens = frame.winfo_children()
-        for ch in childrens:
-            childs = ch.winfo_children()
-
-            print([type(child) for child in childs])
+    def load_random_sudoku(self, frame):
+        if self.worker or self.generator:
+            return
 
-    def on_deletion(self, event):
+        size = self.board_size.get()
 
-        text = event.widget
-        val = event.widget.get("1.0", "end-1c")
-        print('delete called %s' % val)
+        # generating runs on a worker thread, the board is swapped in once it is done
+        self.status_label['text'] = 'Generating...'
+        self.status_label['fg'] = 'black'
+        self.generator = GenerateWorker(size)
+        self.generator.start()
+        self.after(FRAME_MS, lambda: self.show_random_sudoku(frame))
 
-        # check if still it's valid
-        try:
-            val = int(val)
-            text.cell.val = val
-            text['fg'] = "white"
-            text['bg'] = 'rosybrown3'
-            text['relief'] = 'sunken'
+    def show_random_sudoku(self, frame):
+        if not self.generator.finished():
+            self.after(FRAME_MS, lambda: self.show_random_sudoku(frame))
             return
-        except:
-            print("Invalid literal")
-            text['bg'] = 'rosybrown1'
-            text['fg'] = 'black'
-            text['relief'] = "groove"
-            text.cell.val = -1
-
-    def on_modification(self, event, delete=True):
-        text = event.widget
-        val = event.widget.get("1.0", "end-1c")
-        try:
-            val = int(val)
-            if val > 9:
-                val = val % 10
-            print('insert called %s' % val)
-        except:
-            print("Invalid literal")
-            text.delete("1.0", tk.END)
+
+        random_sudoku, self.generator = self.generator.result, None
+        self.status_label['text'] = ''
+        if random_sudoku is None:
+            # None only when the generator thread died on an error
+            self.status_label['text'] = 'Unable to generate \na sudoku'
+            self.status_label['fg'] = 'red'
             return
 
-        text['fg'] = "white"
-        text['bg'] = 'rosybrown3'
-        text['relief'] = 'sunken'
-        text.cell.val = val
-
-    def update_cell_at_runtime(self, cell_gui_obj, value, moves_label_gui_obl, moves_val):
-        cell_gui_obj.delete("1.0", tk.END)
-        if value == -1:
-            cell_gui_obj.insert('')
-            cell_gui_obj['bg'] = 'rosybrown2'
-            # cell.label['relief'] = 'groove'
-        else:
-            cell_gui_obj.insert(value)
-            cell_gui_obj['bg'] = 'rosybrown2'
-            # cell.label['relief'] = 'groove'
+        self.solver = Solver(gui=self, **{'matrix': random_sudoku, 'size': len(random_sudoku)})
+        self.session = Session(self.solver)
+        self.create_sudoku_layout(frame)
 
-        if moves_label_gui_obl:
-            moves_label_gui_obl['text'] = "{}".format(moves_val)
-        self.update_idletasks()
+    def create_empty_sudoku(self, frame, size=None):
+        if self.worker or self.generator:
+            return
 
-        time.sleep(int(self.slider.get()) / 1000)
+        size = size or self.board_size.get()
+        self.solver = Solver(gui=self, **{'matrix': [], 'size': size})
+        self.session = Session(self.solver)
+        self.create_sudoku_layout(frame)
 
-    def vcmd(self, action, index, value_if_allowed,
-             prior_value, text, validation_type, trigger_type, widget_name):
+    def edit_cell(self, cell, val):
+        """ passes an edit from the board on to the session and redraws the cells it can change: the
+            edited cell and its peers, whose possible moves and conflicts depend on it """
+        self.session.edit(cell, val)
 
-        if value_if_allowed:
-            try:
-                int(value_if_allowed)
-                return True
-            except ValueError:
-                return False
-        else:
-            return False
+        self.board.refresh(cell)
+        for peer in self.solver.get_peers(cell):
+            self.board.refresh(peer)
+
+    def update_cell_at_runtime(self, label, value, moves_label, moves):
+        # label is the cell's index on the board, see create_sudoku_layout
+        self.board.show_move(label, value, moves)
 
     def solve_sudoku(self, frame):
 
-        self.retrieve_input(frame)
+        if self.worker or self.generator or not self.session:
+            return
 
-        children = frame.winfo_children()
+        # no edits while the solver works on the cells
+        self.board.editable = False
 
-        text_labels = []
+        self.status_label['text'] = 'Solving...'
+        self.status_label['fg'] = 'black'
 
-        # un-binding events so that solver does not interfere
-        for child in children:
-            for sub_child in child.winfo_children():
-                sub_child.unbind("<<TextModified>>")
-                sub_child.unbind("<<TextDeleted>>")
-                text_labels.append(sub_child)
+        # the search runs on a worker thread, its moves come back through a queue drained every frame
+        self.worker = SolveWorker(self.session)
+        self.worker.delay = int(self.slider.get()) / 1000
+        self.worker.start()
+        self.after(FRAME_MS, self.show_progress)
 
-        self.status_label['text'] = ''
+    def show_progress(self):
+        worker = self.worker
+        worker.delay = int(self.slider.get()) / 1000
 
-        validation_status, solver_status = self.solver.solve()
+        for label, value, moves_label, moves in worker.drain():
+            self.update_cell_at_runtime(label, value, moves_label, moves)
 
-        if not validation_status:
-            self.status_label['text'] = 'Invalid input. \nUnable to solve the sudoku'
-            self.status_label['fg'] = 'red'
+        if worker.finished():
+            self.finish_solve()
+        else:
+            self.after(FRAME_MS, self.show_progress)
+
+    def finish_solve(self):
+        worker = self.worker
+        self.worker = None
+        self.pause_bt['text'] = 'PAUSE'
+
+        # None only when the search thread died on an error
+        validation_status, solver_status = worker.result or (False, False)
+        stopped = isinstance(solver_status, BudgetExceeded)
+
+        if stopped:
+            # cancelled: take back whatever the search had filled in
+            self.session.clear_solution()
+
+        if worker.instant or stopped:
+            # moves made without queueing events never reached the board
+            for cell in self.solver.cells:
+                if cell in self.session.solution or cell.val == -1:
+                    self.board.refresh(cell)
+
+        if stopped:
+            self.status_label['text'] = 'Solving cancelled \nafter {} moves'.format(solver_status.nodes)
+            self.status_label['fg'] = 'black'
+        else:
+            if not validation_status:
+                self.status_label['text'] = 'Invalid input. \nUnable to solve the sudoku'
+                self.status_label['fg'] = 'red'
+
+            if solver_status:
+                self.status_label['text'] = 'Soduko Solved ! \nTotal moves {}'.format(self.solver.total_moves)
+                self.status_label['fg'] = 'green'
+            else:
+                self.status_label['text'] = 'Invalid input. \nUnable to solve the sudoku'
+                self.status_label['fg'] = 'red'
+
+        self.board.editable = True
 
-        if solver_status:
-            self.status_label['text'] = 'Soduko Solved ! \nTotal moves {}'.format(self.solver.total_moves)
-            self.status_label['fg'] = 'green'
+        logger.info("Total moves: %d", self.solver.total_moves)
+
+    def toggle_pause(self):
+        if not self.worker:
+            return
+        if self.worker.running.is_set():
+            self.worker.pause()
+            self.pause_bt['text'] = 'RESUME'
         else:
-            self.status_label['text'] = 'Invalid input. \nUnable to solve the sudoku'
-            self.status_label['fg'] = 'red'
+            self.worker.resume()
+            self.pause_bt['text'] = 'PAUSE'
 
-        # rebinding events
-        for label in text_labels:
-            label.bind("<<TextModified>>", self.on_modification)
-            label.bind("<<TextDeleted>>", self.on_deletion)
+    def cancel_solve(self):
+        if self.worker:
+            self.worker.cancel()
 
-        print("Total moves: {}".format(self.solver.total_moves))
+    def solve_instantly(self):
+        if self.worker:
+            self.worker.skip_animation()
 
     def create_sudoku_layout(self, frame):
+        if self.board:
+            self.board.destroy()
+
+        self.board = CanvasBoard(frame, self.solver, self.session, self.edit_cell)
+        self.board.set_show_candidates(bool(self.show_possible_moves.get()))
+        self.board.pack(padx=20, pady=20)
+        self.board.focus_set()
 
-        for row, row_cells in enumerate(self.solver.matrix):
-            self.sudoku_cell_gui_objs.append([])
-            for column, cell in enumerate(row_cells):
-                cell_frame = tk.Frame(frame, bg="white", height=70, width=70)
-
-                cell_frame.grid(row=row, column=column, padx=5, pady=5)
-
-                text = CustomText(cell, cell_frame, bg='rosybrown1', fg='black', height=2, width=4,
-                                  font="Times 20 bold", borderwidth=4, relief="groove")
-                text.tag_configure("center", justify='center')
-                text.tag_add("center", 1.0, "end")
-
-                if (cell.val != -1):
-                    text['fg'] = "white"
-                    text['bg'] = 'rosybrown3'
-                    text['relief'] = 'sunken'
-                    text.insert(cell.val)
-                    text['state'] = tk.DISABLED
-                else:
-                    text.insert('')
-                    pass
-                text.pack(ipadx=5, ipady=5)
-                text.bind("<<TextModified>>", self.on_modification)
-                text.bind("<<TextDeleted>>", self.on_deletion)
-
-                self.sudoku_cell_gui_objs[row].append(text)
-                cell.label = text
-
-                if self.show_possible_moves.get():
-                    moves_label = tk.Label(cell_frame, height=1, width=5, bg='rosybrown2',
-                                           font="Times 10 italic")
-                    moves_label.pack(fill="both", expand=True)
-
-                    cell.moves_label = moves_label
+        # the solver hands cell.label back to update_cell_at_runtime, for the board that is the cell's index
+        for index, cell in enumerate(self.solver.cells):
+            cell.label = index
 
     def update_sudoku_layout(self):
-        show_moves = self.show_possible_moves.get()
-        print(show_moves)
-        for row, row_cells in enumerate(self.solver.matrix):
-            for column, cell in enumerate(row_cells):
-                if show_moves:
-                    moves_label = tk.Label(cell.label.master, height=1, width=5, bg='rosybrown2',
-                                           font="Times 10 italic")
-                    moves_label.pack(fill="both", expand=True)
-
-                    cell.moves_label = moves_label
-                else:
-                    cell.moves_label.destroy()
-                    cell.moves_label = None
+        if self.board:
+            self.board.set_show_candidates(bool(self.show_possible_moves.get()))
 
     def create_widgets(self):
 
@@ -234,15 +216,39 @@ class Application(tk.Frame):
                                           command=lambda: self.load_sample_sudoku(sudoku_frame))
         load_sample_sudoku_bt.pack(pady=10)
 
+        load_random_sudoku_bt = tk.Button(side_frame, bg="thistle2", text="RANDOM SUDOKU", height=2, width=20,
+                                          borderwidth=2, relief="raised",
+                                          command=lambda: self.load_random_sudoku(sudoku_frame))
+        load_random_sudoku_bt.pack(pady=10)
+
         create_empty_sudoku_bt = tk.Button(side_frame, bg="thistle2", text="NEW SUDOKU", height=2, width=20,
                                            borderwidth=2, relief="raised",
                                            command=lambda: self.create_empty_sudoku(sudoku_frame))
         create_empty_sudoku_bt.pack(pady=10)
 
+        self.board_size = tk.IntVar(value=9)
+        size_frame = tk.Frame(side_frame)
+        size_frame.pack(pady=5)
+        tk.Label(size_frame, text="board size").pack(side=tk.LEFT)
+        tk.OptionMenu(size_frame, self.board_size, *BOARD_SIZES).pack(side=tk.LEFT)
+
         solve_bt = tk.Button(side_frame, bg="thistle2", text="SOLVE", borderwidth=2, height=2, width=20,
                              relief="raised", command=lambda: self.solve_sudoku(sudoku_frame))
         solve_bt.pack(pady=10)
 
+        controls = tk.Frame(side_frame)
+        controls.pack(pady=10)
+
+        self.pause_bt = tk.Button(controls, bg="thistle2", text="PAUSE", borderwidth=2, width=6,
+                                  relief="raised", command=self.toggle_pause)
+        self.pause_bt.pack(side=tk.LEFT)
+
+        tk.Button(controls, bg="thistle2", text="CANCEL", borderwidth=2, width=6,
+                  relief="raised", command=self.cancel_solve).pack(side=tk.LEFT)
+
+        tk.Button(controls, bg="thistle2", text="INSTANT", borderwidth=2, width=6,
+                  relief="raised", command=self.solve_instantly).pack(side=tk.LEFT)
+
         slider = tk.Scale(side_frame, label="delay (ms)", length=150, bg="thistle2", from_=0, to=1000,
                           tickinterval=200, borderwidth=2, relief="raised",
                           orient=tk.HORIZONTAL, sliderlength=20)
@@ -254,13 +260,15 @@ class Application(tk.Frame):
         self.show_possible_moves = tk.IntVar()
         check_bt = tk.Checkbutton(side_frame, text='show possible moves per cell', variable=self.show_possible_moves,
                                   onvalue=1, offvalue=0,
-                                  command=lambda: print(self.update_sudoku_layout()))
+                                  command=self.update_sudoku_layout)
         check_bt.pack(pady=10, padx=0)
 
 
 if __name__ == '__main__':
     s_time = time.time()
 
+    logging.basicConfig(level=logging.INFO)
+
     root = tk.Tk()
     #
     # img = tk.PhotoImage('demo/sudoku.ico')
@@ -0,0 +1,97 @@
+from SudokuSolver.candidates import count_bits
+from SudokuSolver.grid import Grid
+
+EMPTY_CELL_VALUE = Grid.EMPTY_CELL_VALUE
+
+
+class WeightOrdering(object):
+    """ original heuristic: picks the cell with the most filled cells in its row, column and box """
+
+    def __init__(self, solver):
+        self.solver = solver
+
+    def reset(self):
+        self.solver.compute_weights()
+
+    def update(self, cell, old_value, new_value):
+        self.solver.compute_weights(cell, revert=new_value == EMPTY_CELL_VALUE)
+
+    def refresh(self, cell):
+        pass
+
+    def select(self):
+        return self.solver.get_max_weighted_cell()
+
+
+class MRVOrdering(object):
+    """ minimum remaining values: picks the empty cell with the fewest candidates, ties going to the
+        cell with the most empty cells around it (degree) and then to the lowest position
+
+        empty cells sit in buckets indexed by their candidate count and only the peers of a
+        filled or cleared cell are moved between buckets, so selection never scans the matrix """
+
+    def __init__(self, solver):
+        self.solver = solver
+        self.buckets = []
+        self.counts = dict()
+
+    def reset(self):
+        solver = self.solver
+        self.buckets = [set() for _ in range(solver.size + 1)]
+        self.counts = dict()
+
+        for cell in solver.cells:
+            if cell.val == EMPTY_CELL_VALUE:
+                self._insert(cell)
+
+    def _insert(self, cell):
+        count = count_bits(self.solver.candidates.mask(cell))
+        self.counts[cell] = count
+        self.buckets[count].add(cell)
+
+    def _discard(self, cell):
+        self.buckets[self.counts.pop(cell)].discard(cell)
+
+    def update(self, cell, old_value, new_value):
+        if old_value == EMPTY_CELL_VALUE:
+            self._discard(cell)
+        elif new_value == EMPTY_CELL_VALUE:
+            self._insert(cell)
+
+        cells = self.solver.cells
+        for index in self.solver.topology.peers[cell.row * len(self.solver.matrix) + cell.col]:
+            self.refresh(cells[index])
+
+    def refresh(self, cell):
+        """ re-bucket an empty cell whose candidates changed """
+        if cell in self.counts:
+            self._discard(cell)
+            self._insert(cell)
+
+    def degree_key(self, cell):
+        candidates = self.solver.candidates
+        filled = candidates.filled_in_row(cell.row) + candidates.filled_in_column(cell.col) + \
+            candidates.filled_in_box(cell)
+        return filled, cell.row, cell.col
+
+    def select(self):
+        for bucket in self.buckets:
+            if not bucket:
+                continue
+            if len(bucket) == 1:
+                return next(iter(bucket))
+            return min(bucket, key=self.degree_key)
+
+        return None
+
+
+ORDERINGS = {
+    'weight': WeightOrdering,
+    'mrv': MRVOrdering,
+}
+
+
+def create_ordering(name, solver):
+    if name not in ORDERINGS:
+        raise ValueError("Unknown cell ordering '{}', expected one of {}".format(name, sorted(ORDERINGS)))
+    return ORDERINGS[name](solver)
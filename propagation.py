@@ -0,0 +1,270 @@
+from SudokuSolver.candidates import count_bits, mask_to_values
+from SudokuSolver.grid import Grid
+
+EMPTY_CELL_VALUE = Grid.EMPTY_CELL_VALUE
+
+# cheapest first: after any rule makes progress the cheaper ones get another go before it runs again
+RULES = ('naked_singles', 'hidden_singles', 'naked_pairs', 'hidden_pairs', 'pointing', 'x_wing')
+
+# the rules propagation=True runs; x_wing scans every value across all rows and columns on each pass,
+# which dominates the cost on large grids for few eliminations, so it only runs when named
+DEFAULT_RULES = tuple(rule for rule in RULES if rule != 'x_wing')
+
+
+class Contradiction(Exception):
+    pass
+
+
+class Propagator(object):
+    """ deduces values and rules out candidates until no enabled rule makes progress
+
+        every change goes on a trail so a search can take it back with undo(mark); implied values
+        are filled through the solver like any other move and counted in solver.moves """
+
+    def __init__(self, solver, rules=DEFAULT_RULES):
+        unknown = set(rules) - set(RULES)
+        if unknown:
+            raise ValueError("Unknown propagation rules {}, expected some of {}".format(sorted(unknown), RULES))
+
+        self.solver = solver
+        # a sequence runs in the order given, e.g. easiest first for grading; anything else in RULES order
+        if isinstance(rules, (list, tuple)):
+            self.rules = list(dict.fromkeys(rules))
+        else:
+            self.rules = [rule for rule in RULES if rule in rules]
+        self.removed = dict((rule, 0) for rule in self.rules)
+        self.trail = []
+        self.rows = []
+        self.columns = []
+        self.boxes = []
+        self.units = []
+
+    def reset(self):
+        solver = self.solver
+        self.trail = []
+        self.removed = dict((rule, 0) for rule in self.rules)
+        self.rows = solver.matrix
+        self.columns = [solver.get_cells_in_same_column(column) for column in range(len(solver.matrix))]
+        self.boxes = [solver.same_box_cells[box_no] for box_no in sorted(solver.same_box_cells)]
+        self.units = self.rows + self.columns + self.boxes
+
+    def mark(self):
+        return len(self.trail)
+
+    def undo(self, mark):
+        solver = self.solver
+
+        while len(self.trail) > mark:
+            cell, mask = self.trail.pop()
+            if mask:
+                solver.candidates.include(cell, mask)
+                solver.ordering.refresh(cell)
+            else:
+                cell.possible_moves = []
+                solver.fill_cell(cell, EMPTY_CELL_VALUE)
+                solver.moves.pop()
+
+    def propagate(self):
+        """ returns False as soon as some cell or unit is left without a possible value """
+        try:
+            progress = True
+            while progress:
+                progress = False
+                for rule in self.rules:
+                    if getattr(self, rule)():
+                        progress = True
+                        break
+        except Contradiction:
+            return False
+
+        return True
+
+    def assign(self, cell, value, rule):
+        cell.possible_moves = [value]
+        self.solver.moves.append(cell)
+        self.solver.fill_cell(cell, value)
+        self.trail.append((cell, 0))
+        self.removed[rule] += 1
+
+    def eliminate(self, cell, mask, rule):
+        mask &= self.solver.candidates.mask(cell)
+        if not mask:
+            return False
+
+        self.solver.candidates.exclude(cell, mask)
+        self.solver.ordering.refresh(cell)
+        self.trail.append((cell, mask))
+        self.removed[rule] += count_bits(mask)
+
+        return True
+
+    def naked_singles(self):
+        """ a cell with a single candidate takes it """
+        mask_of = self.solver.candidates.mask
+        progress = False
+
+        for row_cells in self.rows:
+            for cell in row_cells:
+                if cell.val != EMPTY_CELL_VALUE:
+                    continue
+                mask = mask_of(cell)
+                if not mask:
+                    raise Contradiction()
+                if not mask & (mask - 1):
+                    self.assign(cell, mask.bit_length(), 'naked_singles')
+                    progress = True
+
+        return progress
+
+    def hidden_singles(self):
+        """ a value that fits in only one cell of a unit goes there """
+        candidates = self.solver.candidates
+        progress = False
+
+        for unit in self.units:
+            placed = once = twice = 0
+            for cell in unit:
+                if cell.val != EMPTY_CELL_VALUE:
+                    placed |= 1 << (cell.val - 1)
+                    continue
+                mask = candidates.mask(cell)
+                twice |= once & mask
+                once |= mask
+
+            if candidates.full_mask & ~(placed | once):
+                raise Contradiction()
+
+            singles = once & ~twice
+            if not singles:
+                continue
+
+            for cell in unit:
+                if cell.val != EMPTY_CELL_VALUE:
+                    continue
+                mask = candidates.mask(cell) & singles
+                if not mask:
+                    continue
+                if mask & (mask - 1):
+                    raise Contradiction()
+                self.assign(cell, mask.bit_length(), 'hidden_singles')
+                progress = True
+
+        return progress
+
+    def naked_pairs(self):
+        """ two cells of a unit sharing the same two candidates rule them out for the rest of the unit """
+        mask_of = self.solver.candidates.mask
+        progress = False
+
+        for unit in self.units:
+            seen = dict()
+            for cell in unit:
+                if cell.val != EMPTY_CELL_VALUE:
+                    continue
+                mask = mask_of(cell)
+                if count_bits(mask) != 2:
+                    continue
+                if mask not in seen:
+                    seen[mask] = cell
+                    continue
+
+                pair = (seen[mask], cell)
+                for other in unit:
+                    if other.val == EMPTY_CELL_VALUE and other not in pair:
+                        progress = self.eliminate(other, mask, 'naked_pairs') or progress
+
+        return progress
+
+    def hidden_pairs(self):
+        """ two values confined to the same two cells of a unit rule out everything else in those cells """
+        mask_of = self.solver.candidates.mask
+        progress = False
+
+        for unit in self.units:
+            positions = dict()
+            for index, cell in enumerate(unit):
+                if cell.val != EMPTY_CELL_VALUE:
+                    continue
+                for value in mask_to_values(mask_of(cell)):
+                    positions[value] = positions.get(value, 0) | (1 << index)
+
+            paired = dict()
+            for value, position in positions.items():
+                if count_bits(position) != 2:
+                    continue
+                if position not in paired:
+                    paired[position] = value
+                    continue
+
+                keep = (1 << (value - 1)) | (1 << (paired[position] - 1))
+                for index in mask_to_values(position):
+                    cell = unit[index - 1]
+                    progress = self.eliminate(cell, ~keep & mask_of(cell), 'hidden_pairs') or progress
+
+        return progress
+
+    def pointing(self):
+        """ pointing and box/line reduction: a value that, within a box or a line, only fits where the two
+            intersect is ruled out for the rest of the other one """
+        box_of = lambda cell: self.solver.get_box_no(cell.row, cell.col)
+        progress = False
+
+        for lines, line_of in ((self.rows, lambda cell: cell.row), (self.columns, lambda cell: cell.col)):
+            for box_no, box in enumerate(self.boxes):
+                for value_mask, line_no in self.confined(box, line_of):
+                    for other in lines[line_no]:
+                        if other.val == EMPTY_CELL_VALUE and box_of(other) != box_no:
+                            progress = self.eliminate(other, value_mask, 'pointing') or progress
+
+            for line_no, line in enumerate(lines):
+                for value_mask, box_no in self.confined(line, box_of):
+                    for other in self.boxes[box_no]:
+                        if other.val == EMPTY_CELL_VALUE and line_of(other) != line_no:
+                            progress = self.eliminate(other, value_mask, 'pointing') or progress
+
+        return progress
+
+    def x_wing(self):
+        """ a value that fits in just the same two columns of two rows is ruled out for the rest of those
+            columns, and the same with rows and columns swapped """
+        mask_of = self.solver.candidates.mask
+        progress = False
+
+        for lines, crossing in ((self.rows, self.columns), (self.columns, self.rows)):
+            for value in range(1, len(lines) + 1):
+                bit = 1 << (value - 1)
+                seen = dict()
+
+                for line_no, line in enumerate(lines):
+                    positions = 0
+                    for index, cell in enumerate(line):
+                        if cell.val == EMPTY_CELL_VALUE and mask_of(cell) & bit:
+                            positions |= 1 << index
+                    if count_bits(positions) != 2:
+                        continue
+                    if positions not in seen:
+                        seen[positions] = line_no
+                        continue
+
+                    pair = (seen[positions], line_no)
+                    for index in mask_to_values(positions):
+                        for other_no, other in enumerate(crossing[index - 1]):
+                            if other.val == EMPTY_CELL_VALUE and other_no not in pair:
+                                progress = self.eliminate(other, bit, 'x_wing') or progress
+
+        return progress
+
+    def confined(self, unit, group_of):
+        """ (value mask, group) for every value that only fits in cells of one group within unit """
+        mask_of = self.solver.candidates.mask
+        groups = dict()
+
+        for cell in unit:
+            if cell.val != EMPTY_CELL_VALUE:
+                continue
+            group = group_of(cell)
+            for value in mask_to_values(mask_of(cell)):
+                groups.setdefault(value, set()).add(group)
+
+        return [(1 << (value - 1), value_groups.pop()) for value, value_groups in groups.items()
+                if len(value_groups) == 1]
@@ -0,0 +1,164 @@
+import bz2
+import gzip
+import json
+import math
+import mmap
+import sys
+
+from SudokuSolver.grid import Grid
+from SudokuSolver.topology import box_shape
+
+EMPTY_CELL_VALUE = Grid.EMPTY_CELL_VALUE
+
+# value v is written as SYMBOLS[v - 1]; '.' and '0' mark empty cells. Grids with more values than
+# SYMBOLS are written as numbers separated by spaces, which parse_puzzle takes for any size
+SYMBOLS = '123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+BLANKS = '.0'
+SEPARATORS = ', \t'
+
+# smallest grid with boxes, 2x2 boxes; a line shorter than 16 cells is not a puzzle
+MIN_SIZE = 4
+
+COMPRESSED_OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+}
+
+
+def parse_puzzle(line):
+    """ one puzzle per line: N*N symbols row by row, e.g. 81 characters for a 9x9 grid, or N*N numbers
+        separated by spaces or commas; the boxes take topology.box_shape(N) """
+    line = line.strip()
+    if any(separator in line for separator in SEPARATORS):
+        symbols = line.replace(',', ' ').split()
+    else:
+        symbols = line
+    size = math.isqrt(len(symbols))
+
+    if size * size != len(symbols):
+        raise ValueError("Puzzle of {} cells is not a square grid".format(len(symbols)))
+    if size < MIN_SIZE:
+        raise ValueError("Puzzle of {} cells is smaller than {}x{}".format(len(symbols), MIN_SIZE, MIN_SIZE))
+    box_shape(size)
+
+    matrix = []
+    for row in range(size):
+        matrix.append([])
+        for symbol in symbols[row * size:(row + 1) * size]:
+            if symbol in BLANKS:
+                matrix[row].append(EMPTY_CELL_VALUE)
+                continue
+            value = int(symbol) if symbol.isdigit() else SYMBOLS.find(symbol.upper()) + 1
+            if not 0 < value <= size:
+                raise ValueError("Invalid symbol '{}' for a {}x{} puzzle".format(symbol, size, size))
+            matrix[row].append(value)
+
+    return matrix
+
+
+def symbol(value, size):
+    """ how a cell of a size x size grid shows value """
+    if value == EMPTY_CELL_VALUE:
+        return '.'
+    return SYMBOLS[value - 1] if size <= len(SYMBOLS) else str(value)
+
+
+def format_grid(matrix):
+    """ one line per grid, in the form parse_puzzle reads back """
+    size = len(matrix)
+    if size <= len(SYMBOLS):
+        return ''.join('.' if value == EMPTY_CELL_VALUE else SYMBOLS[value - 1] for row in matrix for value in row)
+    return ' '.join(symbol(value, size) for row in matrix for value in row)
+
+
+def open_text(path, mode='r'):
+    """ opens path as text, through gzip or bz2 when its extension says so; '-' is stdin/stdout """
+    if path == '-':
+        return sys.stdin if 'r' in mode else sys.stdout
+
+    for extension, opener in COMPRESSED_OPENERS.items():
+        if path.endswith(extension):
+            return opener(path, mode + 't', encoding='ascii')
+
+    return open(path, mode, encoding='ascii')
+
+
+def _mapped_lines(path):
+    with open(path, 'rb') as stream:
+        try:
+            mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files cannot be mapped
+            return
+        with mapped:
+            for line in iter(mapped.readline, b''):
+                yield line.decode('ascii')
+
+
+def read_puzzles(path, use_mmap=False):
+    """ lazily yields the puzzle lines of a plain, .gz or .bz2 file, skipping blanks and '#' comments
+
+        use_mmap reads plain files through a read-only memory map instead of buffered reads """
+    if use_mmap and path != '-' and not any(path.endswith(extension) for extension in COMPRESSED_OPENERS):
+        lines = _mapped_lines(path)
+    else:
+        lines = _stream_lines(path)
+
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+
+def _stream_lines(path):
+    stream = open_text(path)
+    try:
+        for line in stream:
+            yield line
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def read_matrices(path, use_mmap=False):
+    """ yields the matrix of each puzzle of a file, parsed only when it is reached """
+    for line in read_puzzles(path, use_mmap):
+        yield parse_puzzle(line)
+
+
+class PuzzleWriter(object):
+    """ writes solutions or result records to a plain, .gz or .bz2 file as they come in
+
+        at most buffer_size lines are held in memory before they are handed to the file """
+
+    def __init__(self, path, buffer_size=1024):
+        self.stream = open_text(path, 'w')
+        self.buffer_size = buffer_size
+        self.buffer = []
+
+    def write(self, line):
+        self.buffer.append(line + '\n')
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def write_grid(self, matrix):
+        self.write(format_grid(matrix))
+
+    def write_record(self, record):
+        self.write(json.dumps(record))
+
+    def flush(self):
+        self.stream.writelines(self.buffer)
+        self.buffer = []
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
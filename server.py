@@ -0,0 +1,376 @@
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import time
+
+from SudokuSolver import batch
+from SudokuSolver.solver import BACKENDS, Solver
+
+logger = logging.getLogger(__name__)
+
+# upper bounds in seconds of the latency histogram buckets, the last bucket takes everything slower
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_BODY = 8 * 1024 * 1024
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+           500: 'Internal Server Error', 503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Histogram(object):
+    """ cumulative counts of observed values per upper bound, as Prometheus reports them """
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        bucket = 0
+        while bucket < len(self.bounds) and value > self.bounds[bucket]:
+            bucket += 1
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += value
+
+    def snapshot(self):
+        buckets = dict()
+        running = 0
+        for bound, count in zip(list(self.bounds) + ['+Inf'], self.counts):
+            running += count
+            buckets[str(bound)] = running
+        return {'buckets': buckets, 'count': self.count, 'sum': self.total}
+
+
+def _init_worker(options):
+    """ batch's worker set up, then a solve of the sample puzzle so the worker has its imports and 9x9
+        topology in place before it takes its first request """
+    batch._init_worker(options)
+    sample = Solver.get_sample_sudoku()
+    Solver(matrix=sample, size=len(sample)).solve()
+
+
+def _ready():
+    return os.getpid()
+
+
+def _solve_request(line, max_nodes, deadline):
+    cache = batch._worker_options.get('cache')
+    hits = cache.hits if cache is not None else 0
+
+    # the search stops at the request's deadline too, so a worker is never held past it; time.monotonic()
+    # is the same clock in every process of the machine
+    result = batch.solve_puzzle(line, **dict(batch._worker_options, max_nodes=max_nodes, deadline=deadline))
+    # invalid lines never reach the cache
+    if cache is not None and result['status'] != 'invalid':
+        result['cached'] = cache.hits > hits
+    return result
+
+
+class SolverServer(object):
+    """ answers puzzles posted as JSON over HTTP from a pool of worker processes
+
+        POST /solve takes {"puzzle": line} or {"puzzles": [line, ...]}, optionally with "timeout" in
+        seconds and "max_nodes", both capped by the server's own limits, and returns the batch result
+        record of each puzzle. Puzzles still unanswered at the timeout get status 'timeout'.
+        At most max_pending puzzles are queued or solving at a time, a request that does not fit is
+        turned away with 503. GET /metrics reports queue depth, latencies and the cache hit rate """
+
+    def __init__(self, workers=None, max_pending=256, timeout=10.0, max_nodes=1000000, **options):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.max_nodes = max_nodes
+        # passed on to batch._init_worker: Solver options plus cache_size and cache_path
+        self.options = options
+
+        self.executor = None
+        self.loop = None
+        self.server = None
+
+        self.pending = 0
+        self.requests = 0
+        self.rejected = 0
+        self.statuses = dict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.latency = Histogram()
+        self.solve_time = Histogram()
+
+    async def start(self, host='127.0.0.1', port=8080):
+        """ starts the pool and waits for it to answer, then listens; every worker solves a warm up
+            puzzle in its initializer, before it takes any job """
+        self.loop = asyncio.get_running_loop()
+        self.start_pool()
+        await asyncio.gather(*[self.loop.run_in_executor(self.executor, _ready) for _ in range(self.workers)])
+
+        self.server = await asyncio.start_server(self.handle, host, port)
+        logger.info("Listening on %s with %d workers",
+                    ', '.join('{}:{}'.format(*sock.getsockname()[:2]) for sock in self.server.sockets),
+                    self.workers)
+        return self.server
+
+    def start_pool(self):
+        self.executor = concurrent.futures.ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                                               initargs=(self.options,))
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    async def handle(self, reader, writer):
+        """ serves the requests of one connection, kept open between requests unless asked otherwise """
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                    status, payload = await self.route(method, path, body)
+                except HttpError as error:
+                    keep_alive = False
+                    status, payload = error.status, {'error': str(error)}
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as error:
+                    logger.exception("Request failed")
+                    keep_alive = False
+                    status, payload = 500, {'error': str(error)}
+
+                writer.write(encode_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        path = path.split('?', 1)[0]
+
+        if path == '/solve':
+            if method != 'POST':
+                raise HttpError(405, "Use POST for /solve")
+            return await self.solve_request(body)
+        if path == '/metrics':
+            return 200, self.metrics()
+        if path == '/health':
+            return 200, {'status': 'ok', 'workers': self.workers}
+
+        raise HttpError(404, "No such path {}".format(path))
+
+    async def solve_request(self, body):
+        start = time.perf_counter()
+
+        try:
+            request = json.loads(body or b'null')
+        except ValueError as error:
+            raise HttpError(400, "Body is not JSON: {}".format(error))
+        if not isinstance(request, dict):
+            raise HttpError(400, "Expected a JSON object with 'puzzle' or 'puzzles'")
+
+        single = 'puzzle' in request
+        puzzles = [request['puzzle']] if single else request.get('puzzles')
+        if not isinstance(puzzles, list) or not all(isinstance(puzzle, str) for puzzle in puzzles):
+            raise HttpError(400, "Expected 'puzzle' as a string or 'puzzles' as a list of strings")
+        if not puzzles:
+            raise HttpError(400, "'puzzles' is empty")
+
+        timeout = self.limit(request, 'timeout', self.timeout, (int, float))
+        max_nodes = self.limit(request, 'max_nodes', self.max_nodes, int)
+
+        if len(puzzles) > self.max_pending:
+            raise HttpError(413, "At most {} puzzles per request".format(self.max_pending))
+        if self.pending + len(puzzles) > self.max_pending:
+            self.rejected += 1
+            raise HttpError(503, "Queue full, {} puzzles pending".format(self.pending))
+
+        self.requests += 1
+        results = await self.solve(puzzles, timeout, max_nodes)
+        self.latency.observe(time.perf_counter() - start)
+
+        if single:
+            return (504 if results[0]['status'] == 'timeout' else 200), results[0]
+        return 200, {'results': results}
+
+    @staticmethod
+    def limit(request, name, maximum, types):
+        """ the request's value of a budget, no more than the server's own """
+        value = request.get(name)
+        if value is None:
+            return maximum
+        if isinstance(value, bool) or not isinstance(value, types) or value <= 0:
+            raise HttpError(400, "'{}' must be a positive number".format(name))
+        return value if maximum is None else min(value, maximum)
+
+    async def solve(self, puzzles, timeout, max_nodes):
+        """ result records of the puzzles in order, status 'timeout' for those not back in time """
+        deadline = time.monotonic() + timeout
+        futures = [self.submit(line, max_nodes, deadline) for line in puzzles]
+        done, _ = await asyncio.wait(futures, timeout=timeout)
+
+        results = []
+        for line, future in zip(puzzles, futures):
+            if future in done and not future.exception():
+                result = future.result()
+            elif future in done:
+                logger.error("Worker failed on %r: %s", line, future.exception())
+                result = {'puzzle': line.strip(), 'solution': None, 'status': 'error',
+                          'error': str(future.exception()), 'nodes': 0}
+            else:
+                # a queued puzzle is dropped, one already solving stops at the deadline
+                future.cancel()
+                result = {'puzzle': line.strip(), 'solution': None, 'status': 'timeout', 'nodes': 0,
+                          'time': timeout}
+            self.record(result)
+            results.append(result)
+        return results
+
+    def submit(self, line, max_nodes, deadline):
+        try:
+            future = self.executor.submit(_solve_request, line, max_nodes, deadline)
+        except concurrent.futures.process.BrokenProcessPool:
+            logger.error("Worker pool broken, starting a new one")
+            self.start_pool()
+            future = self.executor.submit(_solve_request, line, max_nodes, deadline)
+
+        self.pending += 1
+        future.add_done_callback(self.on_done)
+        return asyncio.wrap_future(future)
+
+    def on_done(self, future):
+        # the pool completes its futures on one of its threads, pending is only touched on the loop
+        try:
+            self.loop.call_soon_threadsafe(self.finished)
+        except RuntimeError:
+            # the loop already closed while shutting down
+            pass
+
+    def finished(self):
+        self.pending -= 1
+
+    def record(self, result):
+        status = result['status']
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if 'cached' in result:
+            if result['cached']:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+        if status != 'timeout' and 'time' in result:
+            self.solve_time.observe(result['time'])
+
+    def metrics(self):
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'queue_depth': max(0, self.pending - self.workers),
+            'pending': self.pending,
+            'max_pending': self.max_pending,
+            'workers': self.workers,
+            'requests': self.requests,
+            'rejected': self.rejected,
+            'puzzles': dict(self.statuses),
+            'latency': self.latency.snapshot(),
+            'solve_time': self.solve_time.snapshot(),
+            'cache': {'hits': self.cache_hits, 'misses': self.cache_misses,
+                      'hit_rate': self.cache_hits / lookups if lookups else None},
+        }
+
+
+async def read_request(reader):
+    """ (method, path, headers, body) of the next request on the connection, None once it is closed """
+    line = await reader.readline()
+    if not line.strip():
+        return None
+
+    try:
+        method, path, _ = line.decode('latin-1').split()
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+
+    headers = dict()
+    while True:
+        line = await reader.readline()
+        if not line.strip():
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HttpError(400, "Malformed Content-Length")
+    if length > MAX_BODY:
+        raise HttpError(413, "Body larger than {} bytes".format(MAX_BODY))
+
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), path, headers, body
+
+
+def encode_response(status, payload, keep_alive=True):
+    body = json.dumps(payload).encode('utf-8')
+    head = ['HTTP/1.1 {} {}'.format(status, REASONS.get(status, '')),
+            'Content-Type: application/json',
+            'Content-Length: {}'.format(len(body)),
+            'Connection: {}'.format('keep-alive' if keep_alive else 'close')]
+    if status == 503:
+        head.append('Retry-After: 1')
+    return ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body
+
+
+async def serve(host='127.0.0.1', port=8080, **options):
+    server = SolverServer(**options)
+    await server.start(host, port)
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the solver over HTTP/JSON")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes, one per core by default")
+    parser.add_argument('--max-pending', type=int, default=256, help="puzzles queued or solving before 503s")
+    parser.add_argument('--timeout', type=float, default=10.0, help="longest a request may wait, in seconds")
+    parser.add_argument('--max-nodes', type=int, default=1000000, help="search nodes a puzzle may take")
+    parser.add_argument('--backend', default='backtracking', choices=BACKENDS)
+    parser.add_argument('--heuristic', default='mrv', choices=('mrv', 'weight'))
+    parser.add_argument('--propagation', action='store_true', help="enable the propagation rules, all but x_wing")
+    parser.add_argument('--cache', type=int, help="solutions each worker keeps for repeated or equivalent puzzles")
+    parser.add_argument('--cache-file', help="SQLite file the solution cache is kept in across runs")
+    args = parser.parse_args(argv)
+
+    # the server's own messages only, not a line per solve from the workers
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, max_pending=args.max_pending,
+                          timeout=args.timeout, max_nodes=args.max_nodes, backend=args.backend,
+                          heuristic=args.heuristic, propagation=args.propagation, cache_size=args.cache,
+                          cache_path=args.cache_file))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+from SudokuSolver.grid import Grid
+
+EMPTY_CELL_VALUE = Grid.EMPTY_CELL_VALUE
+
+
+class Session(object):
+    """ a puzzle being edited, kept ready to solve
+
+        every edit updates how often each value appears per row, column and box, so conflicts show up
+        as the user types and the candidates of the edited cell's peers are refreshed on the spot.
+        solve() hands those counts to the same Solver as used-value masks instead of letting it
+        validate and rebuild its state, and takes back the previous solution first """
+
+    def __init__(self, solver):
+        self.solver = solver
+        self.topology = solver.topology
+        self.size = len(solver.matrix)
+        # counts[unit][value]: rows are units 0..N-1, columns N..2N-1, boxes 2N..3N-1
+        self.counts = [[0] * (self.size + 1) for _ in range(3 * self.size)]
+        self.conflicts = set()
+        # cells filled by the last solve() rather than by the user
+        self.solution = set()
+
+        for cell in solver.cells:
+            if cell.val != EMPTY_CELL_VALUE:
+                self.count(cell, cell.val, 1)
+
+        for cell in solver.cells:
+            if self.in_conflict(cell):
+                self.conflicts.add(cell)
+            elif cell.val == EMPTY_CELL_VALUE:
+                cell.possible_moves = self.candidates(cell)
+
+    def units(self, cell):
+        topology, size = self.topology, self.size
+        index = cell.row * size + cell.col
+        return (topology.row_of[index], size + topology.column_of[index], 2 * size + topology.box_of[index])
+
+    def count(self, cell, value, step):
+        counts = self.counts
+        for unit in self.units(cell):
+            counts[unit][value] += step
+
+    def in_conflict(self, cell):
+        if cell.val == EMPTY_CELL_VALUE or cell in self.solution:
+            return False
+        counts = self.counts
+        return any(counts[unit][cell.val] > 1 for unit in self.units(cell))
+
+    def candidates(self, cell):
+        counts = self.counts
+        row, column, box = (counts[unit] for unit in self.units(cell))
+        return [value for value in range(1, self.size + 1) if not (row[value] or column[value] or box[value])]
+
+    def unit_masks(self):
+        """ (rows, columns, boxes) used-value masks as Solver(unit_masks=...) takes them """
+        masks = []
+        for unit in self.counts:
+            mask = 0
+            for value in range(1, self.size + 1):
+                if unit[value]:
+                    mask |= 1 << (value - 1)
+            masks.append(mask)
+        size = self.size
+        return masks[:size], masks[size:2 * size], masks[2 * size:]
+
+    def edit(self, cell, value):
+        """ sets cell to value (EMPTY_CELL_VALUE clears it) and returns the cells, among it and its peers,
+            that went in or out of conflict """
+        if value != EMPTY_CELL_VALUE and not 0 < value <= self.size:
+            raise ValueError("Value {} out of range 1-{}".format(value, self.size))
+
+        if cell in self.solution:
+            # a value the solver filled in was never counted
+            self.solution.discard(cell)
+        elif cell.val != EMPTY_CELL_VALUE:
+            self.count(cell, cell.val, -1)
+
+        if value != EMPTY_CELL_VALUE:
+            self.count(cell, value, 1)
+        cell.val = value
+        cell.possible_moves = []
+
+        changed = []
+        for other in [cell] + self.solver.get_peers(cell):
+            conflict = self.in_conflict(other)
+            if conflict != (other in self.conflicts):
+                if conflict:
+                    self.conflicts.add(other)
+                else:
+                    self.conflicts.discard(other)
+                changed.append(other)
+            if other.val == EMPTY_CELL_VALUE:
+                other.possible_moves = self.candidates(other)
+
+        return changed
+
+    def clear_solution(self):
+        """ empties the cells the last solve() filled in, leaving what the user entered """
+        gui = self.solver.gui
+        for cell in self.solution:
+            cell.val = EMPTY_CELL_VALUE
+            cell.possible_moves = self.candidates(cell)
+            if gui:
+                gui.update_cell_at_runtime(cell.label, cell.val, cell.moves_label, cell.possible_moves)
+        self.solution = set()
+
+    def solve(self):
+        """ solves from the entered cells; (validation, solver status) like Solver.solve """
+        self.clear_solution()
+        if self.conflicts:
+            return False, False
+
+        solver = self.solver
+        empty = [cell for cell in solver.cells if cell.val == EMPTY_CELL_VALUE]
+
+        solver.validated = True
+        solver.unit_masks = self.unit_masks()
+        try:
+            return solver.solve()
+        finally:
+            # after a cancelled search too, so the next solve() takes back what it left behind
+            self.solution = set(cell for cell in empty if cell.val != EMPTY_CELL_VALUE)
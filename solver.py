@@ -1,13 +1,78 @@
 import copy
+import itertools
+import logging
 import random
+import time
 
+from SudokuSolver.budget import Budget, BudgetExceeded
+from SudokuSolver.candidates import create_engine
+from SudokuSolver import compact
+from SudokuSolver.dlx import DancingLinks
 from SudokuSolver.grid import Grid
+from SudokuSolver.ordering import create_ordering
+from SudokuSolver.propagation import DEFAULT_RULES, Propagator
+from SudokuSolver.stats import SolveStats
+from SudokuSolver.tracing import MESSAGES, JsonLinesTrace
+from SudokuSolver.validator import validate_solution
 
 EMPTY_CELL_VALUE = Grid.EMPTY_CELL_VALUE
 
+BACKENDS = ('backtracking', 'dlx', 'compact')
+
+logger = logging.getLogger(__name__)
+
 
 class Solver(Grid):
 
+    def __init__(self, gui=None, **kwargs):
+        super().__init__(gui, **kwargs)
+
+        # 'backtracking' runs the cell by cell search below, 'dlx' an exact cover search on dancing links
+        # and 'compact' a snapshot search on a flat CompactGrid copy of the matrix
+        self.backend = kwargs.get('backend', 'backtracking')
+        if self.backend not in BACKENDS:
+            raise ValueError("Unknown backend '{}', expected one of {}".format(self.backend, BACKENDS))
+
+        # 'bitmask' keeps per-unit used-value masks up to date in fill_cell, 'set' rescans the units
+        self.candidates = create_engine(kwargs.get('candidates', 'bitmask'), self)
+        # 'mrv' picks the cell with the fewest candidates, 'weight' the one with the most filled neighbours
+        self.ordering = create_ordering(kwargs.get('heuristic', 'mrv'), self)
+
+        # True for propagation.DEFAULT_RULES, or the names of propagation.RULES to run, a list or tuple running
+        # in its order
+        rules = kwargs.get('propagation')
+        self.propagator = Propagator(self, DEFAULT_RULES if rules is True else rules) if rules else None
+        self.guesses = 0
+
+        # callable(event, fields) or a text stream that gets one JSON line per search event
+        trace = kwargs.get('trace')
+        self.trace = JsonLinesTrace(trace) if trace is not None and not callable(trace) else trace
+        # search events are only built when tracing or debug logging is on, see solve()
+        self.debug = False
+        self.givens = None
+
+        # set when the matrix was already checked for repeated values, e.g. by vectorized.validate_batch;
+        # unit_masks optionally hands over its (rows, columns, boxes) used-value masks as well
+        self.validated = kwargs.get('validated', False)
+        self.unit_masks = kwargs.get('unit_masks')
+
+        # a cache.SolutionCache consulted before searching and filled with every solution found
+        self.cache = kwargs.get('cache')
+
+        # the search gives up after max_nodes nodes, timeout seconds, at a time.monotonic() deadline or once
+        # cancel_token, a budget.CancellationToken, is cancelled; solve() then returns a BudgetExceeded status
+        self.max_nodes = kwargs.get('max_nodes')
+        self.timeout = kwargs.get('timeout')
+        self.deadline = kwargs.get('deadline')
+        self.cancel_token = kwargs.get('cancel_token')
+        self.budget = None
+        self.started = None
+
+        # every solve() leaves a stats.SolveStats in stats; with collect_stats on, see enable_stats(), it
+        # also times the search steps and counts its events, off it costs the search nothing
+        self.collect_stats = kwargs.get('stats', False)
+        self.stats = None
+
     def compute_weights(self, cell=None, revert=False):
         """ for optimizing recursive calls assign weight to each cell in the matrix
             cell with max weight is solved first """
@@ -19,9 +84,9 @@ class Solver(Grid):
             same_col_cells = self.get_cells_in_same_column(cell.col)
             same_box_cells = self.get_cells_in_same_box(cell)
 
-            row_wt = len(list(filter(lambda x: x.val != EMPTY_CELL_VALUE, same_row_cells)))
-            col_wt = len(list(filter(lambda x: x.val != EMPTY_CELL_VALUE, same_col_cells)))
-            box_wt = len(list(filter(lambda x: x.val != EMPTY_CELL_VALUE, same_box_cells)))
+            row_wt = self.candidates.filled_in_row(cell.row)
+            col_wt = self.candidates.filled_in_column(cell.col)
+            box_wt = self.candidates.filled_in_box(cell)
 
             if revert:
                 original_cell.row_w = row_wt
@@ -56,7 +121,7 @@ class Solver(Grid):
             box_considered = []
 
             for row_index, matrix_row in enumerate(self.matrix):
-                row_wt = len(list(filter(lambda x: x.val != EMPTY_CELL_VALUE, matrix_row)))
+                row_wt = self.candidates.filled_in_row(row_index)
 
                 for cell in matrix_row:
                     if cell.val != EMPTY_CELL_VALUE:
@@ -65,7 +130,7 @@ class Solver(Grid):
                     cell.wt += cell.row_w
 
                     same_box_cells = self.get_cells_in_same_box(cell)
-                    box_wt = len(list(filter(lambda x: x.val != EMPTY_CELL_VALUE, same_box_cells)))
+                    box_wt = self.candidates.filled_in_box(cell)
 
                     same_box_cells = filter(lambda x: x.val == -1, same_box_cells)
 
@@ -79,7 +144,7 @@ class Solver(Grid):
 
             for col in range(0, len(self.matrix)):
                 same_col_cells = self.get_cells_in_same_column(col)
-                col_wt = len(list(filter(lambda x: x.val != EMPTY_CELL_VALUE, same_col_cells)))
+                col_wt = self.candidates.filled_in_column(col)
 
                 for cell in same_col_cells:
                     if cell.val != EMPTY_CELL_VALUE:
@@ -99,111 +164,367 @@ class Solver(Grid):
 
         return max_wt_cell
 
-    def find_possible_values(self, cell):
-        same_box_cells = self.get_cells_in_same_box(cell)
-        same_col_cells = self.get_cells_in_same_column(cell.col)
-        same_row_cells = self.matrix[cell.row]
-
-        total_possible_values = [i + 1 for i in range(0, self.const ** 2)]
-
-        valid_values = set(total_possible_values) - set(map(lambda x: x.val, same_box_cells)) - set(
-            map(lambda x: x.val, same_col_cells)) - set(map(lambda x: x.val, same_row_cells))
+    def select_cell(self):
+        return self.ordering.select()
 
-        return list(valid_values) if valid_values else []
+    def find_possible_values(self, cell):
+        return self.candidates.get(cell)
 
     def fill_cell(self, cell, value):
+        old_value = cell.val
+        self.candidates.place(cell, old_value, value)
         cell.val = value
+        if self.constraints:
+            self.place_constraints(cell.row * self.size + cell.col, old_value, value)
+        self.ordering.update(cell, old_value, value)
+        if self.constraints:
+            # candidates of the cells sharing a constraint, not just the row, column and box, changed
+            cells = self.cells
+            for index in self.constraint_peers[cell.row * self.size + cell.col]:
+                self.ordering.refresh(cells[index])
         self.total_moves += 1
-        print("MOVES: {}".format(self.total_moves))
+        if self.debug:
+            self.log_event('fill', row=cell.row, col=cell.col, value=value, moves=self.total_moves)
 
         if self.gui:
             self.gui.update_cell_at_runtime(cell.label, cell.val, cell.moves_label, cell.possible_moves)
 
+    def log_event(self, event, **fields):
+        if self.trace:
+            self.trace(event, fields)
+        if self.collect_stats:
+            self.stats.event(event, fields)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(MESSAGES[event].format(**fields))
+
+    def propagate(self):
+        if not self.propagator:
+            return True
+        return self.propagator.propagate()
+
+    def undo_propagation(self, mark):
+        if self.propagator:
+            self.propagator.undo(mark)
+
+    def propagation_mark(self):
+        return self.propagator.mark() if self.propagator else 0
+
+    def propagation_report(self):
+        """ deductions made by each enabled rule and the number of guesses the search still needed """
+        report = dict(self.propagator.removed) if self.propagator else dict()
+        report['guesses'] = self.guesses
+        return report
+
     def is_solved(self):
         return len(self.moves) == self.required_moves
 
     def verify(self):
-        solution = [[8, 3, 5, 4, 1, 6, 9, 2, 7],
-                    [2, 9, 6, 8, 5, 7, 4, 3, 1],
-                    [4, 1, 7, 2, 9, 3, 6, 5, 8],
-                    [5, 6, 9, 1, 3, 4, 7, 8, 2],
-                    [1, 2, 3, 6, 7, 8, 5, 4, 9],
-                    [7, 4, 8, 5, 2, 9, 1, 6, 3],
-                    [6, 5, 2, 7, 8, 1, 3, 9, 4],
-                    [9, 8, 1, 3, 4, 5, 2, 7, 6],
-                    [3, 7, 4, 9, 6, 2, 8, 1, 5]]
-
-        for row, row_elements in enumerate(self.matrix):
-            for column, cell in enumerate(row_elements):
-                if cell.val != solution[row][column]:
-                    return False
-
-        return True
+        """ checks the current matrix is a complete solution that keeps the givens of the last solve() """
+        values = [[cell.val for cell in row] for row in self.matrix]
+        if not validate_solution(values, self.givens, self.topology.box):
+            return False
+        flat = [value for row in values for value in row]
+        return all(constraint.consistent(flat) for constraint in self.constraints)
 
     def solve_recursively(self):
 
         if self.is_solved():
-            print("SODOKU SOLVED")
+            if self.debug:
+                self.log_event('solved')
             return True
 
-        cell = self.get_max_weighted_cell()
+        cell = self.select_cell()
 
         possible_values = self.find_possible_values(cell)
-        print("New max weighted cell [{},{}] with possible moves {}".format(cell.row, cell.col, possible_values))
+        if self.debug:
+            self.log_event('select', row=cell.row, col=cell.col, candidates=possible_values, depth=len(self.moves))
 
         if not possible_values:
-            print("Wrong move picked: [{},{}]> {}".format(cell.row, cell.col, cell.val))
+            if self.debug:
+                self.log_event('dead_end', row=cell.row, col=cell.col)
             return False
 
         cell.possible_moves = copy.copy(possible_values)
         self.moves.append(cell)
+        mark = self.propagation_mark()
 
         for move in possible_values:
             self.fill_cell(cell, move)
+            if len(possible_values) > 1:
+                self.guesses += 1
 
-            self.compute_weights(cell)
+            if self.debug:
+                self.log_event('move', row=cell.row, col=cell.col, value=move)
+            status = self.propagate() and self.solve_recursively()
 
-            print("Chose move [{},{}]->{} ".format(cell.row, cell.col, move))
-            print()
-            status = self.solve_recursively()
-
-            print("Status of move [{},{}]->{} = {}".format(cell.row, cell.col, move, status))
+            if self.debug:
+                self.log_event('status', row=cell.row, col=cell.col, value=move, status=bool(status))
 
             if status:
                 return True
 
+            self.undo_propagation(mark)
             cell.possible_moves.remove(move)
 
         else:
-            print("All possible moves on [{},{}] failed. Need to backtrack now".format(cell.row, cell.col))
+            if self.debug:
+                self.log_event('backtrack', row=cell.row, col=cell.col)
 
             cell.possible_moves = []
 
             self.fill_cell(cell, -1)
-            self.compute_weights(cell, revert=True)
             self.moves.pop()
 
             return False
 
-    def solve(self):
+    def solve_iteratively(self):
+        """ same search as solve_recursively driven by an explicit trail instead of the call stack,
+            stops at the first solution and leaves it in the matrix """
+        return next(self.search_iteratively(), False)
+
+    def search_iteratively(self, unwind=False):
+        """ generator behind solve_iteratively, yields True every time the matrix holds a solution and
+            resumes by backtracking from it
+
+            each trail entry is [cell, possible values, index of the next value to try, propagation mark];
+            backtracking undoes the deductions made since the mark and clears the entry's cell, every
+            other change is undone by fill_cell's hooks. With unwind set, closing the generator early
+            backtracks the whole trail so the matrix is back to where the search started """
+        trail = []
+
+        budget = self.budget
+
+        try:
+            while True:
+                if budget is not None and budget.exceeded(self.total_moves):
+                    return
+
+                if self.is_solved():
+                    if self.debug:
+                        self.log_event('solved')
+                    yield True
+                else:
+                    cell = self.select_cell()
+
+                    possible_values = self.find_possible_values(cell)
+                    if self.debug:
+                        self.log_event('select', row=cell.row, col=cell.col, candidates=possible_values,
+                                       depth=len(trail))
+
+                    if possible_values:
+                        cell.possible_moves = list(possible_values)
+                        self.moves.append(cell)
+                        trail.append([cell, possible_values, 0, self.propagation_mark()])
+                    elif self.debug:
+                        self.log_event('dead_end', row=cell.row, col=cell.col)
+
+                while trail:
+                    entry = trail[-1]
+                    cell, possible_values, index, mark = entry
+
+                    if index:
+                        self.undo_propagation(mark)
+                        cell.possible_moves.remove(possible_values[index - 1])
+
+                    if index < len(possible_values):
+                        entry[2] = index + 1
+                        self.guesses += len(possible_values) > 1
+                        self.fill_cell(cell, possible_values[index])
+                        if self.debug:
+                            self.log_event('move', row=cell.row, col=cell.col, value=possible_values[index])
+                        if self.propagate():
+                            break
+                        continue
+
+                    if self.debug:
+                        self.log_event('backtrack', row=cell.row, col=cell.col)
+
+                    cell.possible_moves = []
+                    self.fill_cell(cell, EMPTY_CELL_VALUE)
+                    self.moves.pop()
+                    trail.pop()
+                else:
+                    return
+        finally:
+            if unwind:
+                while trail:
+                    cell, _, _, mark = trail.pop()
+                    self.undo_propagation(mark)
+                    cell.possible_moves = []
+                    self.fill_cell(cell, EMPTY_CELL_VALUE)
+                    self.moves.pop()
+
+    def play_back(self, assignments):
+        """ fills (row, column, value) assignments found by another engine, keeping moves and the GUI in sync """
+        for row, column, value in assignments:
+            cell = self.matrix[row][column]
+            cell.possible_moves = [value]
+            self.moves.append(cell)
+            self.fill_cell(cell, value)
+
+    def solve_exact_cover(self):
+        """ solves with Algorithm X and plays the solution back through fill_cell;
+            total_moves ends up as the number of rows the exact cover search tried """
+        links = DancingLinks(self)
+        solution = next(links.solutions(self.budget), None)
+
+        if solution is None:
+            logger.info("Exact cover search found no solution after %d nodes", links.nodes)
+        else:
+            # the search left its placements in the constraints, play_back places them again
+            self.reset_constraints()
+            self.play_back(solution)
+
+        self.total_moves = links.nodes
+        return solution is not None and self.is_solved()
+
+    def solve_compact(self):
+        """ solves on a CompactGrid snapshot of the matrix; total_moves ends up as the grids tried """
+        solutions, nodes = compact.search(compact.CompactGrid.from_grid(self), budget=self.budget)
+        solution = solutions[0] if solutions else None
+
+        if solution is None:
+            logger.info("Compact search found no solution after %d nodes", nodes)
+        else:
+            values = solution.to_matrix()
+            self.play_back([(cell.row, cell.col, values[cell.row][cell.col])
+                            for row_cells in self.matrix for cell in row_cells if cell.val == EMPTY_CELL_VALUE])
+
+        self.total_moves = nodes
+        return solution is not None and self.is_solved()
+
+    def puzzle(self):
+        """ the givens of the last solve() as a matrix """
+        size = len(self.matrix)
+        return [self.givens[row * size:(row + 1) * size] for row in range(size)]
+
+    def solve_from_cache(self):
+        """ plays back the cached solution of this puzzle or of an equivalent one, False when there is none;
+            total_moves stays 0, nothing was searched """
+        solution = self.cache.get(self.puzzle(), self.topology.box)
+        if solution is None:
+            return False
+
+        logger.info("Solution found in the cache")
+        self.play_back([(cell.row, cell.col, solution[index]) for index, cell in enumerate(self.cells)
+                        if cell.val == EMPTY_CELL_VALUE])
         self.total_moves = 0
+        return self.is_solved()
+
+    def prepare(self):
+        """ resets the counters and engines for a new search; False when the givens repeat a value """
+        self.total_moves = 0
+        self.guesses = 0
+        # counted again from the matrix below and moves of an earlier search dropped, so the same Solver
+        # can solve again after its matrix changed
+        self.required_moves = 0
+        self.moves = []
+        self.started = time.monotonic()
+        self.budget = Budget.create(self.max_nodes, self.timeout, self.deadline, self.cancel_token)
+        self.stats = SolveStats(self.backend, self.collect_stats)
+        if self.collect_stats:
+            self.stats.install(self)
+        else:
+            SolveStats.uninstall(self)
+        self.debug = self.trace is not None or self.collect_stats or logger.isEnabledFor(logging.DEBUG)
+        self.givens = [cell.val for cell in self.cells]
+
+        if self.validated:
+            self.initialize()
+            validation = True
+        else:
+            validation = self.validate_and_init()
+
+        # the givens are checked against the constraints even when validated, batch validation only
+        # knows rows, columns and boxes
+        if validation and self.constraints and not self.reset_constraints():
+            validation = False
+
+        logger.info("Validation status %s", validation)
+
+        if validation:
+            self.candidates.reset(self.unit_masks)
+            self.ordering.reset()
+            if self.propagator:
+                self.propagator.reset()
 
-        validation = self.validate_and_init()
+        return validation
 
-        print("Validation status {}".format(validation))
+    def solve(self):
+        validation = self.prepare()
 
         if validation:
-            self.compute_weights()
+            # the cache keys puzzles by their givens alone, constraints would be lost on the way
+            use_cache = self.cache is not None and not self.constraints
+            if use_cache and self.solve_from_cache():
+                solver_status = True
+            else:
+                if self.backend == 'dlx':
+                    solver_status = self.solve_exact_cover()
+                elif self.backend == 'compact':
+                    solver_status = self.solve_compact()
+                else:
+                    solver_status = self.propagate() and self.solve_iteratively()
 
-            solver_status = self.solve_recursively()
+                if self.out_of_budget():
+                    solver_status = self.budget_status()
+                    logger.info("Search stopped: %r", solver_status)
 
-            print("Status of solving sudoku: {}".format(solver_status))
+                if solver_status and use_cache:
+                    self.cache.put(self.puzzle(), [cell.val for cell in self.cells], self.topology.box)
+
+            logger.info("Status of solving sudoku: %s", solver_status)
+            self.stats.finish(self, self.started)
 
             return validation, solver_status
 
         else:
             return validation, False
 
+    def enable_stats(self, enabled=True):
+        """ switches detailed statistics on or off from the next solve() """
+        self.collect_stats = enabled
+
+    def out_of_budget(self):
+        return self.budget is not None and self.budget.reason is not None
+
+    def budget_status(self):
+        """ the BudgetExceeded status of a search that stopped at its budget, with its statistics so far """
+        return BudgetExceeded(self.budget.reason, self.total_moves, self.guesses, len(self.moves),
+                              time.monotonic() - self.started)
+
+    def count_solutions(self, limit=2):
+        """ number of solutions of the puzzle, counting stops at limit (None counts them all);
+            limit=2 tells a unique puzzle (1) from one with several (2) or none (0).
+            The matrix is left holding the givens, total_moves the nodes the search tried.
+            A search stopped by its budget returns the solutions found so far, see out_of_budget() """
+        if not self.prepare():
+            return 0
+
+        if self.backend == 'dlx':
+            links = DancingLinks(self)
+            count = sum(1 for _ in itertools.islice(links.solutions(self.budget), limit))
+            self.total_moves = links.nodes
+
+        elif self.backend == 'compact':
+            solutions, self.total_moves = compact.search(compact.CompactGrid.from_grid(self), limit,
+                                                            budget=self.budget)
+            count = len(solutions)
+
+        else:
+            count = 0
+            if self.propagate():
+                search = self.search_iteratively(unwind=True)
+                for _ in search:
+                    count += 1
+                    if count == limit:
+                        break
+                search.close()
+            self.undo_propagation(0)
+
+        self.stats.finish(self, self.started)
+        logger.info("Solutions found: %d (limit %s)", count, limit)
+        return count
 
 if __name__ == '__main__':
     pass
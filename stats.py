@@ -0,0 +1,160 @@
+import argparse
+import collections
+import cProfile
+import io
+import json
+import pstats
+import time
+
+from SudokuSolver.puzzle_io import parse_puzzle
+
+# solver methods timed while collection is on: cell selection (get_max_weighted_cell or the MRV buckets),
+# the candidate lookup of the selected cell, weight maintenance and propagation. The times are inclusive,
+# weights maintained for cells that propagation fills count towards both compute_weights and propagate
+TIMED = ('select_cell', 'find_possible_values', 'compute_weights', 'propagate', 'undo_propagation')
+
+# solver.ordering methods timed as ordering_<name>: with MRV, update recomputes the candidate masks of the
+# peers of every filled or cleared cell, which is where most candidate generation happens
+ORDERING_TIMED = ('update',)
+
+
+class SolveStats(object):
+    """ what one solve() spent
+
+        nodes, guesses and elapsed time come with every solve. With collection on the solver's search
+        events also give backtracks, dead ends, maximum depth and per depth how many candidates the
+        chosen cells had, and TIMED methods are wrapped to add up the time spent in them. Only the
+        backtracking search reports events, the dlx and compact backends get the totals """
+
+    def __init__(self, backend, detailed=False):
+        self.backend = backend
+        self.detailed = detailed
+        self.nodes = 0
+        self.guesses = 0
+        self.elapsed = 0.0
+        self.backtracks = 0
+        self.dead_ends = 0
+        self.max_depth = 0
+        names = TIMED + tuple('ordering_' + name for name in ORDERING_TIMED)
+        self.timings = dict.fromkeys(names, 0.0)
+        self.calls = dict.fromkeys(names, 0)
+        # branching[depth][candidates]: cells picked at that depth with that many candidates
+        self.branching = collections.defaultdict(collections.Counter)
+
+    def install(self, solver):
+        """ shadows the TIMED methods of solver and the ORDERING_TIMED ones of its ordering with timing
+            wrappers bound to these stats """
+        for name in TIMED:
+            setattr(solver, name, self.timed(name, getattr(type(solver), name).__get__(solver)))
+        ordering = solver.ordering
+        for name in ORDERING_TIMED:
+            setattr(ordering, name, self.timed('ordering_' + name, getattr(type(ordering), name).__get__(ordering)))
+
+    @staticmethod
+    def uninstall(solver):
+        """ drops the wrappers so the plain methods run again """
+        for name in TIMED:
+            solver.__dict__.pop(name, None)
+        for name in ORDERING_TIMED:
+            solver.ordering.__dict__.pop(name, None)
+
+    def timed(self, name, method):
+        timings, calls, clock = self.timings, self.calls, time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                timings[name] += clock() - start
+                calls[name] += 1
+
+        return wrapper
+
+    def event(self, event, fields):
+        """ counts a search event, the solver's log_event passes them on while collection is on """
+        if event == 'select':
+            depth = fields['depth']
+            self.branching[depth][len(fields['candidates'])] += 1
+            self.max_depth = max(self.max_depth, depth + 1)
+        elif event == 'backtrack':
+            self.backtracks += 1
+        elif event == 'dead_end':
+            self.dead_ends += 1
+
+    def finish(self, solver, started):
+        self.nodes = solver.total_moves
+        self.guesses = solver.guesses
+        self.elapsed = time.monotonic() - started
+
+    def as_dict(self):
+        report = {'backend': self.backend, 'nodes': self.nodes, 'guesses': self.guesses, 'elapsed': self.elapsed}
+        if self.detailed:
+            report.update({
+                'backtracks': self.backtracks,
+                'dead_ends': self.dead_ends,
+                'max_depth': self.max_depth,
+                'timings': dict(self.timings),
+                'calls': dict(self.calls),
+                'branching': {depth: dict(sorted(counts.items())) for depth, counts in sorted(self.branching.items())},
+            })
+        return report
+
+
+def profile(solver, sort='cumulative', limit=30, profiler='cprofile'):
+    """ runs solver.solve() under a profiler and returns (its result, the profiler's text report);
+        profiler is 'cprofile' or 'pyinstrument', the latter only when it is installed """
+    if profiler == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ImportError("pyinstrument profiles need pyinstrument, install it with 'pip install pyinstrument'")
+
+        capture = Profiler()
+        capture.start()
+        try:
+            result = solver.solve()
+        finally:
+            capture.stop()
+        return result, capture.output_text()
+
+    if profiler != 'cprofile':
+        raise ValueError("Unknown profiler '{}', expected 'cprofile' or 'pyinstrument'".format(profiler))
+
+    capture = cProfile.Profile()
+    result = capture.runcall(solver.solve)
+    stream = io.StringIO()
+    pstats.Stats(capture, stream=stream).sort_stats(sort).print_stats(limit)
+    return result, stream.getvalue()
+
+
+def main(argv=None):
+    from SudokuSolver.solver import BACKENDS, Solver
+
+    parser = argparse.ArgumentParser(description="Solve one puzzle and report where the search spent its effort")
+    parser.add_argument('puzzle', help="puzzle line, '.' or '0' for empty cells")
+    parser.add_argument('--backend', default='backtracking', choices=BACKENDS)
+    parser.add_argument('--heuristic', default='mrv', choices=('mrv', 'weight'))
+    parser.add_argument('--propagation', action='store_true', help="enable the propagation rules, all but x_wing")
+    parser.add_argument('--profile', choices=('cprofile', 'pyinstrument'), help="also print a profile of the solve")
+    parser.add_argument('--sort', default='cumulative', help="cProfile sort order")
+    args = parser.parse_args(argv)
+
+    try:
+        matrix = parse_puzzle(args.puzzle)
+    except ValueError as error:
+        parser.error(str(error))
+    solver = Solver(matrix=matrix, size=len(matrix), backend=args.backend, heuristic=args.heuristic,
+                    propagation=args.propagation, stats=True)
+
+    if args.profile:
+        _, report = profile(solver, sort=args.sort, profiler=args.profile)
+        print(report)
+    else:
+        solver.solve()
+
+    print(json.dumps(solver.stats.as_dict(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
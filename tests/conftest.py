@@ -0,0 +1,24 @@
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the modules import each other as SudokuSolver.<module>, the name of the repository directory; the
+# package is loaded from it under that name whatever the checkout is called
+if 'SudokuSolver' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('SudokuSolver', os.path.join(ROOT, '__init__.py'),
+                                                  submodule_search_locations=[ROOT])
+    package = importlib.util.module_from_spec(spec)
+    sys.modules['SudokuSolver'] = package
+    spec.loader.exec_module(package)
+
+# Arto Inkala's 2012 puzzle from corpora/hardest.txt and its only solution
+PUZZLE = '8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..'
+SOLUTION = '812753649943682175675491283154237896369845721287169534521974368438526917796318452'
+
+
+def corpus(name):
+    """ the puzzle lines of corpora/<name>.txt """
+    with open(os.path.join(ROOT, 'corpora', name + '.txt')) as lines:
+        return [line.strip() for line in lines if line.strip() and not line.startswith('#')]
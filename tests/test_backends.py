@@ -0,0 +1,85 @@
+import pytest
+
+from SudokuSolver.puzzle_io import parse_puzzle
+from SudokuSolver.solver import BACKENDS, Solver
+from conftest import PUZZLE, SOLUTION, corpus
+
+CONFIGURATIONS = [
+    {'backend': 'backtracking'},
+    {'backend': 'backtracking', 'candidates': 'set'},
+    {'backend': 'backtracking', 'propagation': True},
+    {'backend': 'dlx'},
+    {'backend': 'compact'},
+]
+
+
+def values(solver):
+    return ''.join(str(cell.val) for row in solver.matrix for cell in row)
+
+
+@pytest.mark.parametrize('options', CONFIGURATIONS)
+def test_known_solution(options):
+    solver = Solver(matrix=parse_puzzle(PUZZLE), size=9, **options)
+
+    assert solver.solve() == (True, True)
+    assert values(solver) == SOLUTION
+
+
+def solves(lines, size=9, **options):
+    for line in lines:
+        solver = Solver(matrix=parse_puzzle(line), size=size, **options)
+        assert solver.solve() == (True, True)
+        assert solver.verify()
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_corpus(backend):
+    solves(corpus('hardest') + corpus('easy'), backend=backend)
+
+
+def test_weight_heuristic():
+    solves(corpus('easy'), heuristic='weight')
+
+
+def test_minimal_puzzles():
+    # plain search takes seconds on some of them, exact cover milliseconds
+    solves(corpus('17clue'), backend='dlx')
+
+
+@pytest.mark.parametrize('options', [{'backend': 'dlx'}, {'propagation': True}])
+def test_large_grid(options):
+    solves(corpus('16x16')[:3], size=16, **options)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('size, box', [(4, None), (6, (2, 3)), (6, (3, 2)), (12, None)])
+def test_empty_grid(backend, size, box):
+    solver = Solver(matrix=[[-1] * size for _ in range(size)], size=size, backend=backend, box=box)
+
+    assert solver.solve() == (True, True)
+    assert solver.verify()
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_repeated_given(backend):
+    matrix = parse_puzzle(PUZZLE)
+    matrix[0][1] = 8
+
+    assert Solver(matrix=matrix, size=9, backend=backend).solve() == (False, False)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_no_solution(backend):
+    # valid givens, but the first cell is left without a candidate: 1-8 in its row and 9 in its column
+    matrix = [[-1] * 9 for _ in range(9)]
+    matrix[0][1:] = [1, 2, 3, 4, 5, 6, 7, 8]
+    matrix[4][0] = 9
+    solver = Solver(matrix=matrix, size=9, backend=backend)
+
+    assert solver.solve() == (True, False)
+    assert solver.count_solutions() == 0
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        Solver(matrix=parse_puzzle(PUZZLE), size=9, backend='quantum')
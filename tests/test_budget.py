@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+from SudokuSolver.budget import CANCELLED, NODES, TIME, BudgetExceeded, CancellationToken
+from SudokuSolver.puzzle_io import parse_puzzle
+from SudokuSolver.solver import BACKENDS, Solver
+from conftest import PUZZLE, corpus
+
+# a 17 clue puzzle plain search takes a couple of seconds on
+SLOW = corpus('17clue')[7]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_node_limit(backend):
+    solver = Solver(matrix=parse_puzzle(SLOW), size=9, backend=backend, max_nodes=50)
+    validation, status = solver.solve()
+
+    assert validation
+    assert isinstance(status, BudgetExceeded)
+    assert not status
+    assert status.reason == NODES
+    assert status.nodes == solver.total_moves
+    if backend == 'backtracking':
+        # the budget is checked once per node, cells cleared while backtracking count as moves too
+        assert 50 <= status.nodes < 50 + 81
+    else:
+        assert status.nodes == 50
+    assert solver.out_of_budget()
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_enough_nodes(backend):
+    solver = Solver(matrix=parse_puzzle(PUZZLE), size=9, backend=backend, max_nodes=100000)
+
+    assert solver.solve() == (True, True)
+    assert not solver.out_of_budget()
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_timeout(backend):
+    status = Solver(matrix=parse_puzzle(SLOW), size=9, backend=backend, timeout=0).solve()[1]
+
+    assert status.reason == TIME
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_cancelled_before_start(backend):
+    token = CancellationToken()
+    token.cancel()
+
+    status = Solver(matrix=parse_puzzle(SLOW), size=9, backend=backend, cancel_token=token).solve()[1]
+
+    assert status.reason == CANCELLED
+    assert status.nodes == 0
+
+
+def test_cancelled_from_another_thread():
+    token = CancellationToken()
+    # the timeout only ends the search should cancelling fail, reason would then be 'time'
+    solver = Solver(matrix=parse_puzzle(SLOW), size=9, candidates='set', cancel_token=token, timeout=60)
+    timer = threading.Timer(0.05, token.cancel)
+    timer.start()
+    try:
+        status = solver.solve()[1]
+    finally:
+        timer.cancel()
+
+    assert status.reason == CANCELLED
+    assert status.as_dict()['nodes'] == solver.total_moves > 0
+
+
+def test_count_solutions_stops_at_the_limit():
+    solver = Solver(matrix=parse_puzzle('.' + PUZZLE[1:]), size=9, backend='dlx', max_nodes=5)
+
+    assert solver.count_solutions() == 0
+    assert solver.out_of_budget()
+    assert solver.budget.reason == NODES
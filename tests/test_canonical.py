@@ -0,0 +1,127 @@
+import random
+
+import pytest
+
+from SudokuSolver.cache import SolutionCache
+from SudokuSolver.canonical import canonical_form
+from SudokuSolver.puzzle_io import parse_puzzle
+from SudokuSolver.solver import Solver
+from SudokuSolver.validator import validate_solution
+from conftest import PUZZLE, SOLUTION, corpus
+
+
+def shuffled_lines(rng, size, width):
+    """ a line order that keeps bands of width lines together """
+    bands = rng.sample(range(size // width), size // width)
+    return [band * width + line for band in bands for line in rng.sample(range(width), width)]
+
+
+def transformed(matrix, rng, box=(3, 3)):
+    """ matrix with its bands, stacks, rows within bands and columns within stacks reordered, values
+        relabelled and, for square boxes, maybe transposed """
+    size = len(matrix)
+    rows = shuffled_lines(rng, size, box[0])
+    columns = shuffled_lines(rng, size, box[1])
+    labels = [0] + rng.sample(range(1, size + 1), size)
+    result = [[-1 if matrix[row][column] == -1 else labels[matrix[row][column]] for column in columns]
+              for row in rows]
+    if box[0] == box[1] and rng.random() < 0.5:
+        result = [list(line) for line in zip(*result)]
+    return result
+
+
+def flat(matrix):
+    return [value for row in matrix for value in row]
+
+
+def test_key_invariant_under_transforms():
+    rng = random.Random(7)
+    for line in corpus('17clue') + corpus('hardest') + corpus('easy'):
+        matrix = parse_puzzle(line)
+        key = canonical_form(matrix)[0]
+        for _ in range(5):
+            assert canonical_form(transformed(matrix, rng))[0] == key
+
+
+def test_key_invariant_for_rectangular_boxes():
+    rng = random.Random(3)
+    matrix = [[-1] * 6 for _ in range(6)]
+    for row, column, value in ((0, 0, 1), (0, 4, 2), (1, 2, 3), (3, 1, 4), (4, 5, 5), (5, 3, 6), (2, 2, 2)):
+        matrix[row][column] = value
+    key = canonical_form(matrix, (2, 3))[0]
+
+    for _ in range(10):
+        assert canonical_form(transformed(matrix, rng, (2, 3)), (2, 3))[0] == key
+    assert canonical_form(matrix, (3, 2))[0] != key
+
+
+def test_different_puzzles_differ():
+    lines = corpus('easy')
+    assert len(set(canonical_form(parse_puzzle(line))[0] for line in lines)) == len(lines)
+
+    # a key is the puzzle itself in canonical order and labels, one given fewer is another puzzle
+    matrix = parse_puzzle(PUZZLE)
+    key = canonical_form(matrix)[0]
+    matrix[0][0] = -1
+    assert canonical_form(matrix)[0] != key
+
+
+def test_transform_round_trip():
+    rng = random.Random(11)
+    solution = parse_puzzle(SOLUTION)
+    for _ in range(10):
+        matrix = transformed(solution, rng)
+        key, transform = canonical_form(matrix)
+        canonical = transform.apply(flat(matrix))
+        assert bytes(canonical) == key
+        assert transform.restore(canonical) == flat(matrix)
+
+
+def test_cache_answers_variants():
+    rng = random.Random(5)
+    cache = SolutionCache(16)
+    puzzle, solution = parse_puzzle(PUZZLE), parse_puzzle(SOLUTION)
+    cache.put(puzzle, flat(solution))
+
+    for _ in range(10):
+        variant = transformed(puzzle, rng)
+        found = cache.get(variant)
+        assert found is not None
+        assert validate_solution([found[row * 9:(row + 1) * 9] for row in range(9)], variant)
+    assert (cache.hits, cache.misses) == (10, 0)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = SolutionCache(2)
+    lines = corpus('easy')[:3]
+    for line in lines:
+        solver = Solver(matrix=parse_puzzle(line), size=9, backend='dlx')
+        solver.solve()
+        cache.put(parse_puzzle(line), [cell.val for cell in solver.cells])
+
+    assert cache.get(parse_puzzle(lines[0])) is None
+    assert cache.get(parse_puzzle(lines[2])) is not None
+
+
+def test_cache_file(tmp_path):
+    path = str(tmp_path / 'solutions.db')
+    cache = SolutionCache(16, path)
+    cache.put(parse_puzzle(PUZZLE), flat(parse_puzzle(SOLUTION)))
+    cache.close()
+
+    cache = SolutionCache(16, path)
+    assert cache.get(parse_puzzle(PUZZLE)) == flat(parse_puzzle(SOLUTION))
+    cache.close()
+
+
+@pytest.mark.parametrize('backend', ['backtracking', 'dlx'])
+def test_solver_hit(backend):
+    cache = SolutionCache(16)
+    Solver(matrix=parse_puzzle(PUZZLE), size=9, backend=backend, cache=cache).solve()
+
+    variant = transformed(parse_puzzle(PUZZLE), random.Random(1))
+    solver = Solver(matrix=[row[:] for row in variant], size=9, backend=backend, cache=cache)
+    assert solver.solve() == (True, True)
+    assert solver.total_moves == 0
+    assert validate_solution([[cell.val for cell in row] for row in solver.matrix], variant)
+    assert cache.hits == 1
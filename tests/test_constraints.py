@@ -0,0 +1,92 @@
+import pytest
+
+from SudokuSolver import constraints
+from SudokuSolver.puzzle_io import parse_puzzle
+from SudokuSolver.solver import BACKENDS, Solver
+from conftest import PUZZLE, SOLUTION
+
+GRID = parse_puzzle(SOLUTION)
+
+# every third cell of the solution left as a given
+HALF_GIVEN = [[value if (row + column) % 3 == 0 else -1 for column, value in enumerate(line)]
+              for row, line in enumerate(GRID)]
+
+
+def solved(matrix, rules, backend, **options):
+    solver = Solver(matrix=[row[:] for row in matrix], size=len(matrix), constraints=rules, backend=backend,
+                    **options)
+    assert solver.solve() == (True, True)
+    assert solver.verify()
+    return [[cell.val for cell in row] for row in solver.matrix]
+
+
+def test_methods_are_abstract():
+    class Half(constraints.Constraint):
+        def reset(self, values):
+            pass
+
+    with pytest.raises(TypeError):
+        Half([(0, 0)])
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_diagonals(backend):
+    grid = solved([[-1] * 9 for _ in range(9)], constraints.diagonals(), backend)
+
+    assert len(set(grid[index][index] for index in range(9))) == 9
+    assert len(set(grid[index][8 - index] for index in range(9))) == 9
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_cages(backend):
+    # a cage over each horizontal pair of cells, summing to what the solution holds there
+    cages = [constraints.Cage([(row, column), (row, column + 1)], GRID[row][column] + GRID[row][column + 1])
+             for row in range(9) for column in range(0, 8, 2)]
+    grid = solved(HALF_GIVEN, cages, backend)
+
+    for row in range(9):
+        for column in range(0, 8, 2):
+            assert grid[row][column] + grid[row][column + 1] == GRID[row][column] + GRID[row][column + 1]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_thermometers(backend):
+    # a thermometer along each run of rising values in the solution's rows
+    thermometers = []
+    for row in range(9):
+        run = [(row, 0)]
+        for column in range(1, 10):
+            if column < 9 and GRID[row][column] > GRID[row][column - 1]:
+                run.append((row, column))
+                continue
+            if len(run) > 1:
+                thermometers.append(constraints.Thermometer(run))
+            run = [(row, column)]
+    grid = solved(HALF_GIVEN, thermometers, backend)
+
+    for thermometer in thermometers:
+        values = [grid[row][column] for row, column in thermometer.cells]
+        assert values == sorted(set(values))
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_jigsaw_of_the_boxes(backend):
+    # regions drawn over the boxes with the boxes themselves switched off are the same puzzle
+    layout = [[row // 3 * 3 + column // 3 for column in range(9)] for row in range(9)]
+    grid = solved(parse_puzzle(PUZZLE), constraints.jigsaw(layout), backend, box=(1, 9))
+
+    assert ''.join(str(value) for row in grid for value in row) == SOLUTION
+
+
+def test_givens_break_a_constraint():
+    matrix = parse_puzzle(PUZZLE)
+    cage = constraints.Cage([(0, 0), (0, 1)], 3)
+
+    assert Solver(matrix=matrix, size=9, constraints=[cage]).solve() == (False, False)
+
+
+def test_bad_rules():
+    with pytest.raises(ValueError):
+        Solver(matrix=parse_puzzle(PUZZLE), size=9, constraints=[constraints.Cage([(0, 9)], 5)])
+    with pytest.raises(ValueError):
+        constraints.jigsaw(['A' * 8 + 'B'] * 9)
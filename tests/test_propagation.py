@@ -0,0 +1,69 @@
+import pytest
+
+from SudokuSolver.propagation import DEFAULT_RULES, RULES
+from SudokuSolver.puzzle_io import parse_puzzle
+from SudokuSolver.solver import Solver
+from conftest import corpus
+
+
+def empty_solver(rules):
+    solver = Solver(matrix=[[-1] * 9 for _ in range(9)], size=9, propagation=rules)
+    assert solver.prepare()
+    return solver
+
+
+def test_default_rules_leave_out_x_wing():
+    assert 'x_wing' not in DEFAULT_RULES
+    assert Solver(matrix=[[-1] * 9 for _ in range(9)], size=9, propagation=True).propagator.rules == \
+        list(DEFAULT_RULES)
+
+
+def test_unknown_rule():
+    with pytest.raises(ValueError):
+        empty_solver(['naked_singles', 'swordfish'])
+
+
+def test_x_wing_clears_the_rest_of_both_columns():
+    solver = empty_solver(['x_wing'])
+    # value 1 only fits in columns 2 and 6 of rows 0 and 4
+    for row in (0, 4):
+        for column in range(9):
+            if column not in (2, 6):
+                solver.candidates.exclude(solver.matrix[row][column], 1)
+
+    assert solver.propagator.x_wing()
+
+    for row in range(9):
+        for column in range(9):
+            allowed = solver.candidates.mask(solver.matrix[row][column]) & 1
+            assert allowed == ((row in (0, 4)) == (column in (2, 6)))
+    assert solver.propagator.removed['x_wing'] == 14
+
+
+def test_undo_restores_candidates():
+    solver = empty_solver(RULES)
+    solver.candidates.exclude(solver.matrix[0][0], 0b110)
+    mark = solver.propagator.mark()
+    solver.propagator.eliminate(solver.matrix[0][1], 0b1, 'pointing')
+
+    solver.propagator.undo(mark)
+
+    assert solver.candidates.mask(solver.matrix[0][1]) == solver.candidates.full_mask
+    assert solver.candidates.mask(solver.matrix[0][0]) == solver.candidates.full_mask & ~0b110
+
+
+@pytest.mark.parametrize('rules', [True, RULES, ['naked_singles']])
+def test_propagation_solves(rules):
+    for line in corpus('easy') + corpus('hardest'):
+        matrix = parse_puzzle(line)
+        solver = Solver(matrix=matrix, size=9, propagation=rules)
+        assert solver.solve() == (True, True)
+        assert solver.verify()
+
+
+def test_singles_solve_easy_puzzles_without_guessing():
+    for line in corpus('easy'):
+        matrix = parse_puzzle(line)
+        solver = Solver(matrix=matrix, size=9, propagation=['naked_singles', 'hidden_singles'])
+        solver.solve()
+        assert solver.propagation_report()['guesses'] == 0
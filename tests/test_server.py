@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+from SudokuSolver.server import SolverServer
+from conftest import PUZZLE, SOLUTION, corpus
+
+
+async def request(port, method, path, body=None):
+    """ (status code, decoded JSON body) of one request on a new connection """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else b''
+    writer.write('{} {} HTTP/1.1\r\nContent-Length: {}\r\nConnection: close\r\n\r\n'.format(
+        method, path, len(data)).encode() + data)
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(payload) if payload else None
+
+
+def serve(scenario, **options):
+    """ runs scenario(server, port) against a one worker server """
+    async def run():
+        server = SolverServer(workers=1, **options)
+        await server.start('127.0.0.1', 0)
+        try:
+            return await scenario(server, server.port())
+        finally:
+            await server.stop()
+    return asyncio.run(run())
+
+
+def test_solve_one():
+    async def scenario(server, port):
+        status, result = await request(port, 'POST', '/solve', {'puzzle': PUZZLE})
+        assert status == 200
+        assert result['status'] == 'solved'
+        assert result['solution'] == SOLUTION
+    serve(scenario)
+
+
+def test_solve_many():
+    lines = corpus('easy')[:4] + ['x']
+
+    async def scenario(server, port):
+        status, body = await request(port, 'POST', '/solve', {'puzzles': lines})
+        assert status == 200
+        assert [result['puzzle'] for result in body['results']] == lines
+        assert [result['status'] for result in body['results']] == ['solved'] * 4 + ['invalid']
+    serve(scenario)
+
+
+def test_cache_hit():
+    async def scenario(server, port):
+        first = (await request(port, 'POST', '/solve', {'puzzle': PUZZLE}))[1]
+        second = (await request(port, 'POST', '/solve', {'puzzle': PUZZLE}))[1]
+        assert (first['cached'], second['cached']) == (False, True)
+        assert second['nodes'] == 0
+        assert second['solution'] == SOLUTION
+
+        cache = (await request(port, 'GET', '/metrics'))[1]['cache']
+        assert (cache['hits'], cache['misses']) == (1, 1)
+    serve(scenario, cache_size=16)
+
+
+def test_budgets():
+    async def scenario(server, port):
+        status, result = await request(port, 'POST', '/solve', {'puzzle': PUZZLE, 'max_nodes': 3})
+        assert status == 200
+        assert result['status'] == 'budget_exceeded'
+        assert result['reason'] == 'nodes'
+
+        # the worker stops at the same deadline, its answer may still beat the server's wait
+        status, result = await request(port, 'POST', '/solve', {'puzzle': corpus('17clue')[7], 'timeout': 1e-6})
+        assert (status, result['status'], result.get('reason')) in ((504, 'timeout', None),
+                                                                    (200, 'budget_exceeded', 'time'))
+    serve(scenario)
+
+
+def test_bad_requests():
+    async def scenario(server, port):
+        for body in (b'{', b'[]', {'puzzles': []}, {'puzzles': [1]}, {'puzzle': PUZZLE, 'timeout': -1},
+                     {'puzzle': PUZZLE, 'max_nodes': True}):
+            assert (await request(port, 'POST', '/solve', body))[0] == 400
+        assert (await request(port, 'GET', '/solve'))[0] == 405
+        assert (await request(port, 'GET', '/nowhere'))[0] == 404
+        assert (await request(port, 'POST', '/solve', {'puzzles': [PUZZLE] * 3}))[0] == 413
+    serve(scenario, max_pending=2)
+
+
+def test_queue_full():
+    async def scenario(server, port):
+        server.pending = 2
+        status = (await request(port, 'POST', '/solve', {'puzzle': PUZZLE}))[0]
+        server.pending = 0
+        assert status == 503
+        assert (await request(port, 'GET', '/metrics'))[1]['rejected'] == 1
+    serve(scenario, max_pending=2)
+
+
+def test_unexpected_error():
+    async def scenario(server, port):
+        async def failing_route(method, path, body):
+            raise RuntimeError('broken')
+        server.route = failing_route
+        assert await request(port, 'GET', '/health') == (500, {'error': 'broken'})
+    serve(scenario)
+
+
+def test_metrics():
+    async def scenario(server, port):
+        assert await request(port, 'GET', '/health') == (200, {'status': 'ok', 'workers': 1})
+        await request(port, 'POST', '/solve', {'puzzles': [PUZZLE, 'x']})
+
+        metrics = (await request(port, 'GET', '/metrics'))[1]
+        assert metrics['requests'] == 1
+        assert metrics['puzzles'] == {'solved': 1, 'invalid': 1}
+        assert metrics['pending'] == 0
+        assert metrics['latency']['count'] == 1
+    serve(scenario)
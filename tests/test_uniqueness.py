@@ -0,0 +1,49 @@
+import pytest
+
+from SudokuSolver.puzzle_io import parse_puzzle
+from SudokuSolver.solver import BACKENDS, Solver
+from conftest import PUZZLE, corpus
+
+
+def count(line, size=9, limit=2, **options):
+    solver = Solver(matrix=parse_puzzle(line), size=size, **options)
+    return solver.count_solutions(limit)
+
+
+@pytest.mark.parametrize('name', ['17clue', 'hardest', 'easy'])
+def test_corpus_is_unique(name):
+    for line in corpus(name):
+        assert count(line, backend='dlx') == 1
+
+
+@pytest.mark.parametrize('name, size', [('16x16', 16), ('25x25', 25)])
+def test_large_corpus_is_unique(name, size):
+    for line in corpus(name):
+        assert count(line, size, backend='dlx') == 1
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_backends_agree(backend):
+    for line in corpus('hardest') + corpus('easy'):
+        assert count(line, backend=backend) == 1
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_several_solutions(backend):
+    # without its first given the puzzle has more than one solution
+    line = '.' + PUZZLE[1:]
+    assert count(line, backend=backend) == 2
+    assert count(line, backend=backend, limit=5) > 2
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_count_all(backend):
+    # 288 ways to fill a 4x4 grid
+    assert count('.' * 16, size=4, limit=None, backend=backend) == 288
+
+
+def test_matrix_keeps_the_givens():
+    solver = Solver(matrix=parse_puzzle(PUZZLE), size=9)
+    solver.count_solutions()
+    assert [cell.val for row in solver.matrix for cell in row] == \
+        [value for row in parse_puzzle(PUZZLE) for value in row]
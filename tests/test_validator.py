@@ -0,0 +1,71 @@
+from SudokuSolver.puzzle_io import parse_puzzle
+from SudokuSolver.validator import validate_solution, validate_string, validate_strings
+from conftest import PUZZLE, SOLUTION
+
+
+def solution_matrix():
+    return parse_puzzle(SOLUTION)
+
+
+def test_valid_solution():
+    assert validate_solution(solution_matrix())
+    assert validate_solution(solution_matrix(), parse_puzzle(PUZZLE))
+
+
+def test_given_changed():
+    givens = parse_puzzle(PUZZLE)
+    givens[0][0] = 1
+    assert not validate_solution(solution_matrix(), givens)
+
+
+def test_flat_givens():
+    givens = [value for row in parse_puzzle(PUZZLE) for value in row]
+    assert validate_solution(solution_matrix(), givens)
+
+
+def test_repeated_value():
+    matrix = solution_matrix()
+    # swapping two cells of a row keeps the row but breaks both columns
+    matrix[0][0], matrix[0][1] = matrix[0][1], matrix[0][0]
+    assert not validate_solution(matrix)
+
+
+def test_incomplete_or_out_of_range():
+    matrix = solution_matrix()
+    matrix[4][4] = -1
+    assert not validate_solution(matrix)
+    matrix[4][4] = 10
+    assert not validate_solution(matrix)
+    assert not validate_solution(solution_matrix()[:8])
+
+
+def test_box_shape():
+    # valid with 2x3 boxes, but its first 3x2 box holds 1 and 2 twice
+    matrix = [[1, 2, 3, 4, 5, 6],
+              [4, 5, 6, 1, 2, 3],
+              [2, 3, 1, 5, 6, 4],
+              [5, 6, 4, 2, 3, 1],
+              [3, 1, 2, 6, 4, 5],
+              [6, 4, 5, 3, 1, 2]]
+    assert validate_solution(matrix, box=(2, 3))
+    assert not validate_solution(matrix, box=(3, 2))
+
+
+def test_validate_string():
+    assert validate_string(SOLUTION)
+    assert validate_string(SOLUTION, PUZZLE)
+    assert not validate_string(SOLUTION, '9' + PUZZLE[1:])
+    assert not validate_string(SOLUTION[1:] + SOLUTION[0])
+    assert not validate_string(SOLUTION[:-1])
+
+
+def test_validate_numbers():
+    numbers = ' '.join(SOLUTION)
+    assert validate_string(numbers, ' '.join('0' if value == '.' else value for value in PUZZLE))
+    assert not validate_string(numbers.replace('8', '10', 1))
+
+
+def test_validate_strings():
+    broken = SOLUTION[:80] + '1'
+    assert list(validate_strings([SOLUTION, broken])) == [True, False]
+    assert list(validate_strings([SOLUTION, SOLUTION], [PUZZLE, '1' + PUZZLE[1:]])) == [True, False]
@@ -0,0 +1,58 @@
+import pytest
+
+from SudokuSolver import vectorized
+from SudokuSolver.puzzle_io import parse_puzzle
+from SudokuSolver.solver import Solver
+from conftest import PUZZLE, SOLUTION, corpus
+
+pytest.importorskip('numpy')
+
+
+def puzzles():
+    return [parse_puzzle(line) for line in corpus('17clue') + corpus('hardest') + corpus('easy')]
+
+
+def test_validate_batch():
+    matrices = puzzles()
+    broken = parse_puzzle(PUZZLE)
+    # 3 is already given further along the row
+    broken[1][0] = 3
+    out_of_range = parse_puzzle(PUZZLE)
+    out_of_range[0][1] = 10
+
+    valid = vectorized.validate_batch(matrices + [broken, out_of_range, parse_puzzle(SOLUTION)])
+
+    assert valid.tolist() == [True] * len(matrices) + [False, False, True]
+
+
+def test_validate_batch_box_shape():
+    # every row and column is fine, the first 3x2 box holds two 1s
+    matrix = [[1, -1, -1, -1, -1, -1],
+              [-1, -1, -1, -1, -1, -1],
+              [-1, 1, -1, -1, -1, -1],
+              [-1, -1, -1, -1, -1, -1],
+              [-1, -1, -1, -1, -1, -1],
+              [-1, -1, -1, -1, -1, -1]]
+    assert vectorized.validate_batch([matrix], box=(2, 3)).tolist() == [True]
+    assert vectorized.validate_batch([matrix], box=(3, 2)).tolist() == [False]
+
+
+def test_unit_masks_match_the_bitmask_engine():
+    matrices = puzzles()
+    rows, columns, boxes = vectorized.unit_masks(vectorized.to_array(matrices))
+
+    for index, matrix in enumerate(matrices):
+        solver = Solver(matrix=matrix, size=9)
+        solver.prepare()
+        assert [int(mask) for mask in rows[index]] == solver.candidates.rows
+        assert [int(mask) for mask in columns[index]] == solver.candidates.columns
+        assert [int(mask) for mask in boxes[index]] == solver.candidates.boxes
+
+
+def test_solve_from_unit_masks():
+    masks = vectorized.unit_masks(vectorized.to_array([parse_puzzle(PUZZLE)]))
+    solver = Solver(matrix=parse_puzzle(PUZZLE), size=9, validated=True,
+                    unit_masks=tuple(unit[0] for unit in masks))
+
+    assert solver.solve() == (True, True)
+    assert ''.join(str(cell.val) for row in solver.matrix for cell in row) == SOLUTION
@@ -0,0 +1,70 @@
+import math
+
+_topologies = dict()
+
+# largest grid the engines take, CompactGrid keeps its values in bytes
+MAX_SIZE = 64
+
+
+def box_shape(size):
+    """ (rows, columns) of the boxes of a size x size grid when none are given: the most square
+        factorisation with rows <= columns, e.g. 3x3 for 9, 2x3 for 6 and 3x4 for 12 """
+    if not 0 < size <= MAX_SIZE:
+        raise ValueError("Grid size {} out of range 1-{}".format(size, MAX_SIZE))
+    rows = max(divisor for divisor in range(1, math.isqrt(size) + 1) if size % divisor == 0)
+    if rows == 1 and size > 1:
+        raise ValueError("A {0}x{0} grid has no box shape, its size is prime".format(size))
+    return rows, size // rows
+
+
+class Topology(object):
+    """ the units and peers of a grid size and box shape as flat row-major cell indexes
+
+        boxes are box_rows high and box_columns wide and numbered row-major; built once per size and shape
+        on first use and shared by every Grid, Solver and CompactGrid of that size """
+    __slots__ = ('size', 'box_rows', 'box_columns', 'row_of', 'column_of', 'box_of', 'rows', 'columns', 'boxes',
+                 'units', 'peers', 'full_mask')
+
+    def __init__(self, size, box_rows, box_columns):
+        cells = range(size * size)
+        stacks = size // box_columns
+
+        self.size = size
+        self.box_rows = box_rows
+        self.box_columns = box_columns
+        self.row_of = tuple(index // size for index in cells)
+        self.column_of = tuple(index % size for index in cells)
+        self.box_of = tuple((index // size // box_rows) * stacks + index % size // box_columns for index in cells)
+        self.full_mask = (1 << size) - 1
+
+        self.rows = tuple(tuple(index for index in cells if self.row_of[index] == row) for row in range(size))
+        self.columns = tuple(tuple(index for index in cells if self.column_of[index] == column)
+                             for column in range(size))
+        self.boxes = tuple(tuple(index for index in cells if self.box_of[index] == box_no) for box_no in range(size))
+        self.units = self.rows + self.columns + self.boxes
+
+        peers = []
+        for index in cells:
+            same = set(self.rows[self.row_of[index]])
+            same.update(self.columns[self.column_of[index]])
+            same.update(self.boxes[self.box_of[index]])
+            same.discard(index)
+            peers.append(tuple(sorted(same)))
+        self.peers = tuple(peers)
+
+    @property
+    def box(self):
+        """ (rows, columns) of a box, as get_topology takes it """
+        return self.box_rows, self.box_columns
+
+
+def get_topology(size, box=None):
+    """ the shared Topology of size, box being (rows, columns) of a box or None for box_shape(size) """
+    box = tuple(box) if box else box_shape(size)
+    topology = _topologies.get((size, box))
+    if topology is None:
+        rows, columns = box
+        if not 0 < size <= MAX_SIZE or rows < 1 or columns < 1 or rows * columns != size:
+            raise ValueError("Boxes of {}x{} cannot tile a {}x{} grid".format(rows, columns, size, size))
+        topology = _topologies[(size, box)] = Topology(size, rows, columns)
+    return topology
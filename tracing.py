@@ -0,0 +1,24 @@
+import json
+
+# log messages for the search events, filled in from the event's fields
+MESSAGES = {
+    'select': "Selected cell [{row},{col}] with possible moves {candidates}",
+    'dead_end': "Wrong move picked: [{row},{col}]",
+    'move': "Chose move [{row},{col}]->{value}",
+    'status': "Status of move [{row},{col}]->{value} = {status}",
+    'fill': "MOVES: {moves}",
+    'backtrack': "All possible moves on [{row},{col}] failed. Need to backtrack now",
+    'solved': "SODOKU SOLVED",
+}
+
+
+class JsonLinesTrace(object):
+    """ writes every search event to a text stream as one JSON object per line """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def __call__(self, event, fields):
+        record = {'event': event}
+        record.update(fields)
+        self.stream.write(json.dumps(record) + '\n')
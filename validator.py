@@ -0,0 +1,96 @@
+import math
+import operator
+
+from SudokuSolver.grid import Grid
+from SudokuSolver.puzzle_io import BLANKS, SEPARATORS, SYMBOLS, parse_puzzle
+from SudokuSolver.topology import get_topology
+
+EMPTY_CELL_VALUE = Grid.EMPTY_CELL_VALUE
+
+# per grid size: one itemgetter per unit, pulling that unit's characters out of a solution string
+_unit_getters = dict()
+
+
+def validate_solution(matrix, givens=None, box=None):
+    """ True when matrix is completely filled, every row, column and box holds each value once and
+        every non-empty given of givens (a matrix or a flat list) is kept; box is the (rows, columns)
+        shape of the boxes, the default one for the size when None """
+    size = len(matrix)
+    topology = get_topology(size, box)
+    values = [value for row in matrix for value in row]
+
+    if len(values) != size * size:
+        return False
+
+    bits = []
+    for value in values:
+        if not 0 < value <= size:
+            return False
+        bits.append(1 << (value - 1))
+
+    full_mask = topology.full_mask
+    for unit in topology.units:
+        mask = 0
+        for index in unit:
+            mask |= bits[index]
+        # size cells covering all size values means no value repeats
+        if mask != full_mask:
+            return False
+
+    if givens is not None:
+        if givens and isinstance(givens[0], list):
+            givens = [value for row in givens for value in row]
+        for given, value in zip(givens, values):
+            if given != EMPTY_CELL_VALUE and given != value:
+                return False
+
+    return True
+
+
+def _getters(size):
+    getters = _unit_getters.get(size)
+    if getters is None:
+        getters = _unit_getters[size] = [operator.itemgetter(*unit) for unit in get_topology(size).units]
+    return getters
+
+
+def validate_string(solution, puzzle=None):
+    """ validate_solution for one-line grids as read and written by puzzle_io """
+    if any(separator in solution for separator in SEPARATORS):
+        # numbers rather than symbols, only large grids are written that way
+        try:
+            matrix = parse_puzzle(solution)
+            givens = parse_puzzle(puzzle) if puzzle is not None else None
+        except ValueError:
+            return False
+        return validate_solution(matrix, givens)
+
+    size = math.isqrt(len(solution))
+    if size * size != len(solution) or not 0 < size <= len(SYMBOLS):
+        return False
+
+    if set(solution) != set(SYMBOLS[:size]):
+        return False
+
+    for getter in _getters(size):
+        if len(set(getter(solution))) != size:
+            return False
+
+    if puzzle is not None:
+        if len(puzzle) != len(solution):
+            return False
+        for given, value in zip(puzzle, solution):
+            if given not in BLANKS and given.upper() != value:
+                return False
+
+    return True
+
+
+def validate_strings(solutions, puzzles=None):
+    """ lazily validates a stream of solution strings, each against its puzzle when puzzles is given """
+    if puzzles is None:
+        for solution in solutions:
+            yield validate_string(solution)
+    else:
+        for solution, puzzle in zip(solutions, puzzles):
+            yield validate_string(solution, puzzle)
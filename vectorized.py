@@ -0,0 +1,75 @@
+# NumPy is optional: nothing else imports this module eagerly and every entry point raises
+# ImportError when it is missing
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from SudokuSolver.grid import Grid
+from SudokuSolver.topology import get_topology
+
+EMPTY_CELL_VALUE = Grid.EMPTY_CELL_VALUE
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("the vectorized pre-pass needs NumPy, install it with 'pip install numpy'")
+
+
+def to_array(matrices):
+    """ stacks same-size matrices into a (batch, N, N) int array with 0 for empty cells """
+    _require_numpy()
+    puzzles = np.asarray(matrices, dtype=np.int16)
+    puzzles[puzzles == EMPTY_CELL_VALUE] = 0
+    return puzzles
+
+
+def one_hot(puzzles):
+    """ (batch, N, N, N) bool array, [b, row, col, v - 1] set when the cell holds v """
+    size = puzzles.shape[-1]
+    return puzzles[..., None] == np.arange(1, size + 1, dtype=puzzles.dtype)
+
+
+def unit_counts(hot, box=None):
+    """ how often each value appears per row, column and box: three (batch, N, N) arrays indexed by unit
+        and value - 1, boxes numbered row-major like Grid.get_box_no; box is the (rows, columns) shape
+        of a box, the default one for the size when None """
+    batch, size = hot.shape[0], hot.shape[1]
+    box_rows, box_columns = get_topology(size, box).box
+
+    rows = hot.sum(axis=2, dtype=np.int16)
+    columns = hot.sum(axis=1, dtype=np.int16)
+    boxes = hot.reshape(batch, size // box_rows, box_rows, size // box_columns, box_columns, size)
+    boxes = boxes.sum(axis=(2, 4), dtype=np.int16).reshape(batch, size, size)
+
+    return rows, columns, boxes
+
+
+def validate_batch(puzzles, box=None):
+    """ (batch,) bool array: True where the puzzle has values in range and no repeated value in any unit """
+    _require_numpy()
+    puzzles = to_array(puzzles) if not isinstance(puzzles, np.ndarray) else puzzles
+    size = puzzles.shape[-1]
+
+    in_range = ((puzzles >= 0) & (puzzles <= size)).all(axis=(1, 2))
+    valid = in_range.copy()
+
+    for counts in unit_counts(one_hot(puzzles), box):
+        valid &= (counts <= 1).all(axis=(1, 2))
+
+    return valid
+
+
+def _pack(used):
+    """ packs a trailing axis of N bools into bitmask ints, bit (v - 1) for value v """
+    size = used.shape[-1]
+    dtype = np.uint64 if size > 62 else np.int64
+    weights = np.left_shift(np.ones(size, dtype=dtype), np.arange(size, dtype=dtype))
+    return (used.astype(dtype) * weights).sum(axis=-1, dtype=dtype)
+
+
+def unit_masks(puzzles, box=None):
+    """ used-value bitmasks per row, column and box: three (batch, N) int arrays """
+    _require_numpy()
+    return tuple(_pack(counts > 0) for counts in unit_counts(one_hot(puzzles), box))
+
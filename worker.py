@@ -0,0 +1,116 @@
+import queue
+import threading
+import time
+
+from SudokuSolver.budget import CancellationToken
+
+
+class SolveWorker(object):
+    """ runs a session's solve() on a worker thread
+
+        while it runs the worker stands in for the solver's gui: every fill_cell becomes a
+        (label, value, moves label, possible moves) event on a bounded queue, which the Tk thread
+        drains with after(). The search waits when the queue is full, so it never gets more than
+        max_events ahead of the screen, and it is paused, cancelled or told to stop animating from
+        the Tk thread through the methods below. Cancelling goes through the solver's cancel_token, the
+        search stops at its next node and solve() returns a BudgetExceeded status """
+
+    def __init__(self, session, max_events=4096):
+        self.session = session
+        self.events = queue.Queue(max_events)
+        self.running = threading.Event()
+        self.running.set()
+        self.done = threading.Event()
+        self.token = CancellationToken()
+        # set from the Tk thread: seconds to wait after each move, and whether to skip animating
+        self.delay = 0
+        self.instant = False
+        self.result = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        solver = self.session.solver
+        gui, solver.gui = solver.gui, self
+        token, solver.cancel_token = solver.cancel_token, self.token
+        try:
+            self.result = self.session.solve()
+        finally:
+            solver.gui = gui
+            solver.cancel_token = token
+            self.done.set()
+
+    def update_cell_at_runtime(self, label, value, moves_label, moves):
+        """ the solver's gui hook, called on the worker thread """
+        self.running.wait()
+        if self.instant or self.token.cancelled:
+            return
+
+        event = (label, value, moves_label, list(moves))
+        while True:
+            try:
+                self.events.put(event, timeout=0.1)
+                break
+            except queue.Full:
+                if self.token.cancelled:
+                    return
+
+        if self.delay:
+            time.sleep(self.delay)
+
+    def pause(self):
+        self.running.clear()
+
+    def resume(self):
+        self.running.set()
+
+    def cancel(self):
+        self.token.cancel()
+        self.running.set()
+
+    def skip_animation(self):
+        """ lets the search run flat out; the board is redrawn once it is done """
+        self.instant = True
+        self.delay = 0
+
+    def drain(self):
+        """ the events queued since the last call, only the latest one per cell, in the order they came """
+        latest = dict()
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            latest.pop(event[0], None)
+            latest[event[0]] = event
+        return list(latest.values())
+
+    def finished(self):
+        return self.done.is_set() and self.events.empty()
+
+
+class GenerateWorker(object):
+    """ generates a random puzzle on a worker thread, so the Tk thread keeps drawing while a large
+        grid is dug out; the Tk thread polls finished() with after() and then reads result """
+
+    def __init__(self, size):
+        self.size = size
+        self.result = None
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        from SudokuSolver.grid import Grid
+
+        try:
+            self.result = Grid.get_random_sudoku(size=self.size)
+        finally:
+            self.done.set()
+
+    def finished(self):
+        return self.done.is_set()